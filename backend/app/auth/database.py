@@ -236,6 +236,37 @@ class AuthDatabase:
             cursor.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
             conn.commit()
     
+    def delete_cleaned_sandboxes(self, sandboxes: List[Dict], event_type: str) -> None:
+        """
+        Remove sandbox records and their users in a single transaction
+        
+        Args:
+            sandboxes: Sandbox rows (db_id, user_id, expires_at) already dropped on SQL Server
+            event_type: Auth audit event to record for each user
+        """
+        if not sandboxes:
+            return
+        
+        db_ids = [(sb['db_id'],) for sb in sandboxes]
+        user_ids = [(sb['user_id'],) for sb in sandboxes]
+        events = [
+            (sb['user_id'], event_type, f"Expired at {sb['expires_at']}", None)
+            for sb in sandboxes
+        ]
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("DELETE FROM sandbox_databases WHERE db_id = ?", db_ids)
+            # Delete in order due to foreign keys
+            cursor.executemany("DELETE FROM sessions WHERE user_id = ?", user_ids)
+            cursor.executemany("DELETE FROM sandbox_databases WHERE user_id = ?", user_ids)
+            cursor.executemany("DELETE FROM users WHERE user_id = ?", user_ids)
+            cursor.executemany(
+                "INSERT INTO auth_audit (user_id, event_type, event_data, ip_address) VALUES (?, ?, ?, ?)",
+                events
+            )
+            conn.commit()
+    
     def log_auth_event(self, user_id: Optional[int], event_type: str, 
                        event_data: Optional[str] = None, ip_address: Optional[str] = None):
         """Log authentication event"""
@@ -213,22 +213,15 @@ class AuthService:
             
             # Run synchronous provisioner in thread pool to avoid blocking
             import asyncio
-            from concurrent.futures import ThreadPoolExecutor
-            
-            loop = asyncio.get_event_loop()
-            executor = ThreadPoolExecutor(max_workers=1)
             
             try:
-                database_name, sql_login, sql_password = await loop.run_in_executor(
-                    executor,
+                database_name, sql_login, sql_password = await asyncio.to_thread(
                     provisioner.create_sandbox_environment,
                     user_data.username
                 )
             except Exception as prov_error:
                 logger.error(f"Provisioner failed: {str(prov_error)}")
                 raise ValueError(f"Failed to create sandbox: {str(prov_error)}")
-            finally:
-                executor.shutdown(wait=False)
             
             # Record sandbox in database
             expires_at = datetime.utcnow() + timedelta(hours=SESSION_DURATION_HOURS)
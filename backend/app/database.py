@@ -1,4 +1,6 @@
 import pyodbc
+import sys
+from functools import lru_cache
 from typing import Optional, List, Tuple, Any
 import logging
 from contextlib import contextmanager
@@ -9,6 +11,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=256)
+def _connection_string_for(database: str) -> str:
+    """Build (once) the interned connection string for a database"""
+    return sys.intern(config.CONNECTION_STRING_TEMPLATE.format(database=database))
+
+
 class DatabaseManager:
     """Manages database connections and executions with connection pooling"""
     
@@ -39,13 +47,7 @@ class DatabaseManager:
         Yields:
             pyodbc.Connection: Database connection
         """
-        conn_str = self.connection_string
-        if database:
-            # Replace database in connection string
-            conn_str = conn_str.replace(
-                f"DATABASE={config.DB_DATABASE}",
-                f"DATABASE={database}"
-            )
+        conn_str = _connection_string_for(database) if database else self.connection_string
         
         conn = None
         try:
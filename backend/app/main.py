@@ -1,8 +1,10 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 import config
 from app.routes import query, schema, websocket, analytics, health
 from app.auth.routes import router as auth_router
@@ -16,6 +18,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background task that expires idle sessions (started on startup)
+_session_sweeper: "asyncio.Task | None" = None
+
+
+async def _sweep_sessions():
+    """Periodically drop expired sessions, off the request path"""
+    from app.utils.security import session_manager
+    interval = max(config.SESSION_TIMEOUT / 10, 1)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            session_manager.cleanup_expired_sessions()
+        except Exception as e:
+            logger.error(f"Session sweep failed: {e}")
+
+
 # Create FastAPI app
 app = FastAPI(
     title="SQL Playground API",
@@ -138,6 +156,15 @@ async def startup_event():
     logger.info(f"Audit Logging: {'Enabled' if config.ENABLE_AUDIT_LOG else 'Disabled'}")
     logger.info("=" * 60)
     
+    # Size the shared default executor used by asyncio.to_thread
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=config.MAX_WORKER_THREADS)
+    )
+    
+    # Expire idle sessions in the background
+    global _session_sweeper
+    _session_sweeper = asyncio.create_task(_sweep_sessions())
+    
     # Validate SQL Server connection
     from app.startup import validate_sql_server_connection
     sql_valid = validate_sql_server_connection()
@@ -185,6 +212,9 @@ async def shutdown_event():
     """Run on application shutdown"""
     logger.info("SQL Playground API shutting down")
     
+    if _session_sweeper is not None:
+        _session_sweeper.cancel()
+    
     # Cleanup expired sessions and sandboxes
     try:
         from app.services.cleanup import cleanup_expired_sandboxes
@@ -194,4 +224,15 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Error during shutdown cleanup: {e}")
     
+    # Flush queued audit log records
+    from app.services.audit import audit_logger
+    audit_logger.close()
+    
+    # Write any pending saved-query use counts (no-op if none were ever queued)
+    try:
+        from app.services.saved_queries import saved_queries_service
+        await asyncio.to_thread(saved_queries_service.flush)
+    except Exception as e:
+        logger.error(f"Error flushing saved query use counts: {e}")
+    
     logger.info("Shutdown complete")
\ No newline at end of file
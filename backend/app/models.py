@@ -9,12 +9,14 @@ class QueryRequest(BaseModel):
     database: Optional[str] = Field(None, description="Target database name")
     session_id: Optional[str] = Field(None, description="User session identifier")
     confirm_destructive: bool = Field(False, description="User confirmed destructive operation")
+    format: str = Field("records", pattern="^(records|tabular)$", description="Result shape: list of dicts or list of row arrays")
 
 
 class QueryResponse(BaseModel):
     """Response model for query execution"""
     success: bool
     data: Optional[List[Dict[str, Any]]] = None
+    rows: Optional[List[List[Any]]] = None
     columns: Optional[List[str]] = None
     row_count: int = 0
     execution_time: float = 0.0
@@ -15,27 +15,25 @@ async def check_sql_server():
     Returns detailed information about SQL Server connection status
     """
     try:
-        conn = provisioner._get_admin_connection()
-        cursor = conn.cursor()
-        
-        # Get version info
-        cursor.execute("SELECT @@VERSION, DB_NAME(), SUSER_NAME()")
-        row = cursor.fetchone()
-        version = row[0]
-        database = row[1]
-        login_name = row[2]
-        
-        # Check permissions
-        cursor.execute("""
-            SELECT 
-                HAS_PERMS_BY_NAME(NULL, 'DATABASE', 'CREATE DATABASE') AS can_create_db,
-                HAS_PERMS_BY_NAME(NULL, 'SERVER', 'ALTER ANY LOGIN') AS can_create_login
-        """)
-        perms = cursor.fetchone()
-        can_create_db = perms[0]
-        can_create_login = perms[1]
-        
-        conn.close()
+        with provisioner._get_admin_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get version info
+            cursor.execute("SELECT @@VERSION, DB_NAME(), SUSER_NAME()")
+            row = cursor.fetchone()
+            version = row[0]
+            database = row[1]
+            login_name = row[2]
+            
+            # Check permissions
+            cursor.execute("""
+                SELECT 
+                    HAS_PERMS_BY_NAME(NULL, 'DATABASE', 'CREATE DATABASE') AS can_create_db,
+                    HAS_PERMS_BY_NAME(NULL, 'SERVER', 'ALTER ANY LOGIN') AS can_create_login
+            """)
+            perms = cursor.fetchone()
+            can_create_db = perms[0]
+            can_create_login = perms[1]
         
         # Check if we have required permissions
         if not can_create_db or not can_create_login:
@@ -75,7 +75,8 @@ async def execute_query(
                 queries=statements,
                 database=request.database,
                 session_id=session_id,
-                confirm_destructive=request.confirm_destructive
+                confirm_destructive=request.confirm_destructive,
+                format=request.format
             )
             
             # Return combined result
@@ -96,7 +97,8 @@ async def execute_query(
                 query=request.query,
                 database=request.database,
                 session_id=session_id,
-                confirm_destructive=request.confirm_destructive
+                confirm_destructive=request.confirm_destructive,
+                format=request.format
             )
             
             # Add to history
@@ -128,13 +130,7 @@ async def get_query_history(
         # Client has a session ID but server doesn't know about it yet
         # This happens when: 1) server restarted, 2) first history poll before first query
         # Create the session so history can accumulate
-        from datetime import datetime
-        session_manager.sessions[x_session_id] = {
-            "created_at": datetime.now(),
-            "last_activity": datetime.now(),
-            "query_count": 0
-        }
-        session_manager.query_history[x_session_id] = []
+        session_manager.create_session(x_session_id)
         return {"history": []}
     
     # Validate session hasn't expired
@@ -153,8 +149,7 @@ async def clear_query_history(
     if not x_session_id:
         return {"message": "No session found"}
     
-    if x_session_id in session_manager.query_history:
-        session_manager.query_history[x_session_id] = []
+    session_manager.clear_history(x_session_id)
     
     return {"message": "History cleared"}
 
@@ -234,13 +229,13 @@ async def analyze_query(request: FormatRequest):
 @router.get("/cache/stats")
 async def get_cache_stats():
     """Get query cache statistics"""
-    return query_cache.get_stats()
+    return await query_cache.get_stats_async()
 
 
 @router.delete("/cache")
 async def clear_cache(database: Optional[str] = None):
     """Clear query cache"""
-    count = query_cache.invalidate(database)
+    count = await query_cache.invalidate_async(database)
     return {"message": f"Cleared {count} cached entries", "count": count}
 
 
@@ -267,7 +262,7 @@ async def get_saved_queries(
         search=search,
         limit=limit
     )
-    return {"queries": queries, "count": len(queries)}
+    return {"queries": [q.to_dict() for q in queries], "count": len(queries)}
 
 
 @router.post("/query/saved")
@@ -289,7 +284,7 @@ async def save_query(
         tags=body.tags,
         is_favorite=body.is_favorite
     )
-    return {"message": "Query saved", "query": saved}
+    return {"message": "Query saved", "query": saved.to_dict()}
 
 
 @router.get("/query/saved/{query_id}")
@@ -303,10 +298,10 @@ async def get_saved_query(
         raise HTTPException(status_code=401, detail="Authentication required")
     
     query = saved_queries_service.get_query(query_id)
-    if not query or query['user_id'] != user['user_id']:
+    if not query or query.user_id != user['user_id']:
         raise HTTPException(status_code=404, detail="Query not found")
     
-    return query
+    return query.to_dict()
 
 
 @router.put("/query/saved/{query_id}")
@@ -334,7 +329,7 @@ async def update_saved_query(
     if not updated:
         raise HTTPException(status_code=404, detail="Query not found")
     
-    return {"message": "Query updated", "query": updated}
+    return {"message": "Query updated", "query": updated.to_dict()}
 
 
 @router.delete("/query/saved/{query_id}")
@@ -368,4 +363,4 @@ async def toggle_favorite(
     if not updated:
         raise HTTPException(status_code=404, detail="Query not found")
     
-    return {"message": "Favorite toggled", "is_favorite": updated['is_favorite']}
\ No newline at end of file
+    return {"message": "Favorite toggled", "is_favorite": bool(updated.is_favorite)}
\ No newline at end of file
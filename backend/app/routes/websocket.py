@@ -52,7 +52,8 @@ async def websocket_endpoint(websocket: WebSocket):
         "session_id": "session-uuid",
         "query": "SQL query",
         "database": "database name",
-        "confirm_destructive": false
+        "confirm_destructive": false,
+        "format": "records" | "tabular"
     }
     
     Response format:
@@ -107,6 +108,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     query = data.get("query")
                     database = data.get("database")
                     confirm_destructive = data.get("confirm_destructive", False)
+                    result_format = data.get("format", "records")
                     
                     if not query:
                         await manager.send_message(session_id, {
@@ -129,7 +131,8 @@ async def websocket_endpoint(websocket: WebSocket):
                         query=query,
                         database=database,
                         session_id=session_id,
-                        confirm_destructive=confirm_destructive
+                        confirm_destructive=confirm_destructive,
+                        format=result_format
                     )
                     
                     # Add to history
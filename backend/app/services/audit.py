@@ -1,6 +1,8 @@
 import json
 import logging
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Optional
 import config
 
@@ -22,15 +24,29 @@ class AuditLogger:
         # Remove existing handlers
         self.audit_logger.handlers = []
         
-        # Create file handler
-        handler = logging.FileHandler(self.log_file, encoding='utf-8')
+        # Create rotating file handler
+        handler = RotatingFileHandler(
+            self.log_file,
+            maxBytes=config.AUDIT_LOG_MAX_BYTES,
+            backupCount=config.AUDIT_LOG_BACKUP_COUNT,
+            encoding='utf-8'
+        )
         handler.setLevel(logging.INFO)
         
         # Create formatter
         formatter = logging.Formatter('%(message)s')
         handler.setFormatter(formatter)
         
-        self.audit_logger.addHandler(handler)
+        # Request handlers only enqueue records; a listener thread does the file I/O
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        self._listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        self._listener.start()
+        
+        self.audit_logger.addHandler(QueueHandler(log_queue))
+    
+    def close(self):
+        """Flush queued audit records to disk and stop the listener thread"""
+        self._listener.stop()
     
     def log_query(
         self,
@@ -1,15 +1,32 @@
 """
 Query caching service with TTL support
 """
+import asyncio
+import sys
 import time
 import hashlib
+from dataclasses import dataclass
+from datetime import date, time as dt_time
+from decimal import Decimal
 from typing import Optional, Dict, Any, Tuple
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 import logging
+import config
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class CacheEntry:
+    """Cached query result with expiry metadata"""
+    __slots__ = ('result', 'expires_at', 'query', 'database')
+    
+    result: Dict[str, Any]
+    expires_at: float
+    query: Optional[str]  # Truncated query, only kept when DEBUG logging
+    database: Optional[str]
+
+
 class QueryCache:
     """In-memory cache for query results with TTL and LRU eviction"""
     
@@ -23,7 +40,9 @@ class QueryCache:
         """
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self._cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
+        # database -> keys of its entries, so invalidate() needn't scan the cache
+        self._by_database: Dict[Optional[str], set] = defaultdict(set)
         self._hits = 0
         self._misses = 0
     
@@ -33,6 +52,17 @@ class QueryCache:
         key_string = f"{database or 'default'}:{normalized}"
         return hashlib.md5(key_string.encode()).hexdigest()
     
+    def _remove(self, key: str) -> None:
+        """Remove an entry and its database index reference"""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_database.get(entry.database)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_database[entry.database]
+    
     def _is_cacheable(self, query: str) -> bool:
         """Check if query result should be cached (SELECT only)"""
         query_upper = query.strip().upper()
@@ -65,8 +95,8 @@ class QueryCache:
         entry = self._cache[key]
         
         # Check TTL
-        if time.time() > entry['expires_at']:
-            del self._cache[key]
+        if time.time() > entry.expires_at:
+            self._remove(key)
             self._misses += 1
             return None
         
@@ -75,7 +105,7 @@ class QueryCache:
         self._hits += 1
         
         logger.debug(f"Cache hit for query: {query[:50]}...")
-        return entry['result']
+        return entry.result
     
     def set(
         self, 
@@ -100,21 +130,24 @@ class QueryCache:
             return False
         
         # Don't cache errors or empty results
-        if not result.get('success') or not result.get('data'):
+        if not result.get('success') or not result.get('rows'):
             return False
         
         key = self._generate_key(query, database)
         
         # Evict oldest if at capacity
         while len(self._cache) >= self.max_size:
-            self._cache.popitem(last=False)
+            self._remove(next(iter(self._cache)))
         
-        self._cache[key] = {
-            'result': result,
-            'expires_at': time.time() + (ttl or self.default_ttl),
-            'query': query[:100],  # Store truncated query for debugging
-            'database': database
-        }
+        # Share one string object across entries for the same database
+        database = sys.intern(database) if database else None
+        self._cache[key] = CacheEntry(
+            result,
+            time.time() + (ttl or self.default_ttl),
+            query[:100] if __debug__ and logger.isEnabledFor(logging.DEBUG) else None,
+            database
+        )
+        self._by_database[database].add(key)
         
         logger.debug(f"Cached query result: {query[:50]}...")
         return True
@@ -132,15 +165,13 @@ class QueryCache:
         if database is None:
             count = len(self._cache)
             self._cache.clear()
+            self._by_database.clear()
             return count
         
-        keys_to_remove = [
-            key for key, entry in self._cache.items()
-            if entry.get('database') == database
-        ]
+        keys_to_remove = self._by_database.pop(database, set())
         
         for key in keys_to_remove:
-            del self._cache[key]
+            self._cache.pop(key, None)
         
         return len(keys_to_remove)
     
@@ -155,23 +186,229 @@ class QueryCache:
             'hits': self._hits,
             'misses': self._misses,
             'hit_rate': round(hit_rate, 2),
-            'default_ttl': self.default_ttl
+            'default_ttl': self.default_ttl,
+            'backend': 'memory'
         }
     
+    # Async entry points for the event loop. The in-memory cache never blocks,
+    # so these call straight through; RedisQueryCache runs them in a thread.
+    async def get_async(self, query: str, database: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Async form of get()"""
+        return self.get(query, database)
+    
+    async def set_async(
+        self,
+        query: str,
+        result: Dict[str, Any],
+        database: Optional[str] = None,
+        ttl: Optional[int] = None
+    ) -> bool:
+        """Async form of set()"""
+        return self.set(query, result, database, ttl)
+    
+    async def invalidate_async(self, database: Optional[str] = None) -> int:
+        """Async form of invalidate()"""
+        return self.invalidate(database)
+    
+    async def get_stats_async(self) -> Dict[str, Any]:
+        """Async form of get_stats()"""
+        return self.get_stats()
+    
     def clear_expired(self) -> int:
         """Remove expired entries"""
         now = time.time()
         expired_keys = [
             key for key, entry in self._cache.items()
-            if now > entry['expires_at']
+            if now > entry.expires_at
         ]
         
         for key in expired_keys:
-            del self._cache[key]
+            self._remove(key)
         
         return len(expired_keys)
 
 
+class RedisQueryCache(QueryCache):
+    """
+    Query cache backed by Redis so all worker processes share one cache
+    
+    Values are serialized with msgpack. Keys embed the database name
+    (qc:{database}:{hash}) so a database can be invalidated by pattern.
+    The client is synchronous, so the *_async methods run it in a thread;
+    if Redis stops answering, lookups become misses for RETRY_AFTER seconds.
+    Requires the optional 'redis' and 'msgpack' packages.
+    """
+    
+    KEY_PREFIX = "qc"
+    RETRY_AFTER = 5.0  # seconds to skip Redis after a failed call
+    
+    def __init__(self, url: str, default_ttl: int = 300, timeout: float = 0.5):
+        super().__init__(max_size=0, default_ttl=default_ttl)
+        try:
+            import msgpack
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' and 'msgpack' packages"
+            ) from e
+        
+        self._msgpack = msgpack
+        self._redis = redis.Redis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+        self._down_until = 0.0
+    
+    def _available(self) -> bool:
+        """False while backing off after a Redis failure"""
+        return time.monotonic() >= self._down_until
+    
+    def _failed(self, action: str, error: Exception) -> None:
+        """Log a Redis failure and stop calling Redis for a while"""
+        logger.error(f"Redis cache {action} failed: {error}")
+        self._down_until = time.monotonic() + self.RETRY_AFTER
+    
+    def _redis_key(self, query: str, database: Optional[str] = None) -> str:
+        """Build Redis key: prefix, database, query hash"""
+        return f"{self.KEY_PREFIX}:{database or 'default'}:{self._generate_key(query, database)}"
+    
+    @staticmethod
+    def _pack_default(value: Any) -> Any:
+        """Fallback serializer for values msgpack can't handle natively"""
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (date, dt_time)):
+            return value.isoformat()
+        return str(value)
+    
+    def get(self, query: str, database: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get cached result from Redis (expiry is handled by Redis TTL)"""
+        if not self._is_cacheable(query):
+            return None
+        
+        if not self._available():
+            self._misses += 1
+            return None
+        
+        try:
+            raw = self._redis.get(self._redis_key(query, database))
+            result = self._msgpack.unpackb(raw, raw=False) if raw is not None else None
+        except Exception as e:
+            self._failed("get", e)
+            result = None
+        
+        if result is None:
+            self._misses += 1
+            return None
+        
+        self._hits += 1
+        logger.debug(f"Cache hit for query: {query[:50]}...")
+        return result
+    
+    def set(
+        self, 
+        query: str, 
+        result: Dict[str, Any], 
+        database: Optional[str] = None,
+        ttl: Optional[int] = None
+    ) -> bool:
+        """Cache query result in Redis with a TTL"""
+        if not self._is_cacheable(query):
+            return False
+        
+        # Don't cache errors or empty results
+        if not result.get('success') or not result.get('rows'):
+            return False
+        
+        if not self._available():
+            return False
+        
+        try:
+            payload = self._msgpack.packb(result, use_bin_type=True, default=self._pack_default)
+            self._redis.set(self._redis_key(query, database), payload, ex=ttl or self.default_ttl)
+        except Exception as e:
+            self._failed("set", e)
+            return False
+        
+        logger.debug(f"Cached query result: {query[:50]}...")
+        return True
+    
+    def invalidate(self, database: Optional[str] = None) -> int:
+        """Invalidate all entries, or only those for one database"""
+        if database is None:
+            pattern = f"{self.KEY_PREFIX}:*"
+        else:
+            # Escape glob metacharacters in the database name
+            escaped = ''.join('\\' + c if c in '*?[]\\' else c for c in database)
+            pattern = f"{self.KEY_PREFIX}:{escaped}:*"
+        
+        count = 0
+        try:
+            batch = []
+            for key in self._redis.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    count += self._redis.delete(*batch)
+                    batch = []
+            if batch:
+                count += self._redis.delete(*batch)
+        except Exception as e:
+            self._failed("invalidate", e)
+        
+        return count
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics (hit/miss counters are per process)
+        
+        The size is the key count of the Redis database (DBSIZE), which
+        assumes REDIS_URL points at a database reserved for the cache.
+        """
+        stats = super().get_stats()
+        stats['backend'] = 'redis'
+        stats['size'] = None
+        if self._available():
+            try:
+                stats['size'] = self._redis.dbsize()
+            except Exception as e:
+                self._failed("stats", e)
+        stats['max_size'] = None
+        return stats
+    
+    async def get_async(self, query: str, database: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Run get() off the event loop"""
+        return await asyncio.to_thread(self.get, query, database)
+    
+    async def set_async(
+        self,
+        query: str,
+        result: Dict[str, Any],
+        database: Optional[str] = None,
+        ttl: Optional[int] = None
+    ) -> bool:
+        """Run set() off the event loop"""
+        return await asyncio.to_thread(self.set, query, result, database, ttl)
+    
+    async def invalidate_async(self, database: Optional[str] = None) -> int:
+        """Run invalidate() off the event loop"""
+        return await asyncio.to_thread(self.invalidate, database)
+    
+    async def get_stats_async(self) -> Dict[str, Any]:
+        """Run get_stats() off the event loop"""
+        return await asyncio.to_thread(self.get_stats)
+    
+    def clear_expired(self) -> int:
+        """Redis expires keys itself"""
+        return 0
+
+
+def _create_query_cache() -> QueryCache:
+    """Create the cache backend selected by config.CACHE_BACKEND"""
+    if config.CACHE_BACKEND == "redis":
+        logger.info("Using Redis query cache")
+        return RedisQueryCache(config.REDIS_URL, default_ttl=300, timeout=config.REDIS_TIMEOUT)
+    return QueryCache(max_size=100, default_ttl=300)
+
+
 # Global cache instance
-query_cache = QueryCache(max_size=100, default_ttl=300)
+query_cache = _create_query_cache()
 
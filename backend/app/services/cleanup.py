@@ -24,7 +24,7 @@ async def cleanup_expired_sandboxes() -> int:
         
         logger.info(f"Found {len(expired)} expired sandbox(es) to cleanup")
         
-        cleaned_count = 0
+        cleaned = []
         for sandbox in expired:
             try:
                 logger.info(f"Cleaning up sandbox: {sandbox['database_name']}")
@@ -35,19 +35,7 @@ async def cleanup_expired_sandboxes() -> int:
                     sql_login=sandbox['sql_login']
                 )
                 
-                # Remove from auth database
-                auth_db.delete_sandbox(sandbox['db_id'])
-                
-                # Delete user
-                auth_db.delete_user(sandbox['user_id'])
-                
-                auth_db.log_auth_event(
-                    sandbox['user_id'],
-                    "sandbox_auto_cleaned",
-                    f"Expired at {sandbox['expires_at']}"
-                )
-                
-                cleaned_count += 1
+                cleaned.append(sandbox)
                 logger.info(f"Successfully cleaned up sandbox: {sandbox['database_name']}")
                 
             except Exception as e:
@@ -55,8 +43,11 @@ async def cleanup_expired_sandboxes() -> int:
                 # Continue with next sandbox even if one fails
                 continue
         
-        logger.info(f"Cleanup complete: {cleaned_count}/{len(expired)} sandboxes cleaned")
-        return cleaned_count
+        # Remove sandbox records, users and log events in one auth DB transaction
+        auth_db.delete_cleaned_sandboxes(cleaned, "sandbox_auto_cleaned")
+        
+        logger.info(f"Cleanup complete: {len(cleaned)}/{len(expired)} sandboxes cleaned")
+        return len(cleaned)
         
     except Exception as e:
         logger.error(f"Error during sandbox cleanup: {e}")
@@ -1,9 +1,9 @@
 import time
+import itertools
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from app.database import db_manager
 from app.services.validator import query_validator
 from app.services.audit import audit_logger
@@ -18,15 +18,19 @@ class QueryExecutor:
     """Handles query execution with timeouts and resource management"""
     
     def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=10)
-        self.active_queries = {}  # session_id -> query info
+        self.active_queries: Dict[str, Dict[int, dict]] = {}  # session_id -> {query id: query info}
+        # Per-session concurrency limit shared by every request of that session
+        self._session_slots: Dict[str, asyncio.Semaphore] = {}
+        self._slot_users: Dict[str, int] = {}  # holders + waiters, to drop idle semaphores
+        self._query_ids = itertools.count(1)
     
     async def execute(
         self,
         query: str,
         database: Optional[str] = None,
         session_id: Optional[str] = None,
-        confirm_destructive: bool = False
+        confirm_destructive: bool = False,
+        format: str = "records"
     ) -> Dict[str, Any]:
         """
         Execute SQL query asynchronously
@@ -36,10 +40,30 @@ class QueryExecutor:
             database: Target database
             session_id: User session identifier
             confirm_destructive: Whether user confirmed destructive operation
+            format: 'records' (list of dicts in 'data') or 'tabular'
+                (list of row arrays in 'rows')
             
         Returns:
             Dictionary with execution results
         """
+        return await self._execute(
+            query, database, session_id, confirm_destructive, format,
+            wait_for_slot=False
+        )
+    
+    async def _execute(
+        self,
+        query: str,
+        database: Optional[str],
+        session_id: Optional[str],
+        confirm_destructive: bool,
+        format: str,
+        wait_for_slot: bool
+    ) -> Dict[str, Any]:
+        """
+        execute(), optionally waiting for a free session slot instead of
+        failing when MAX_CONCURRENT_QUERIES are already running
+        """
         start_time = time.time()
         
         # Validate query
@@ -61,22 +85,20 @@ class QueryExecutor:
                 "execution_time": 0
             }
         
-        # Check concurrent query limit
+        # Check concurrent query limit (shared across all of the session's requests)
         if session_id:
-            active_count = sum(
-                1 for sid, info in self.active_queries.items() 
-                if sid == session_id and info.get("active", False)
-            )
-            if active_count >= config.MAX_CONCURRENT_QUERIES:
+            slot = self._session_slots.get(session_id)
+            if not wait_for_slot and slot is not None and slot.locked():
                 return {
                     "success": False,
                     "error": f"Maximum concurrent queries ({config.MAX_CONCURRENT_QUERIES}) reached",
                     "execution_time": 0
                 }
-        
-        # Track active query
-        if session_id:
-            self.active_queries[session_id] = {
+            await self._acquire_slot(session_id)
+            
+            # Track active query
+            query_id = next(self._query_ids)
+            self.active_queries.setdefault(session_id, {})[query_id] = {
                 "query": query,
                 "start_time": start_time,
                 "active": True
@@ -84,18 +106,17 @@ class QueryExecutor:
         
         try:
             # Check cache first for SELECT queries
-            cached_result = query_cache.get(query, database)
+            cached_result = await query_cache.get_async(query, database)
             if cached_result:
                 logger.debug(f"Cache hit for query: {query[:50]}...")
-                cached_result['from_cache'] = True
-                cached_result['execution_time'] = 0.0
-                return cached_result
+                return self._shape_result(
+                    dict(cached_result, from_cache=True, execution_time=0.0),
+                    format
+                )
             
-            # Execute query in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            rows, columns, row_count = await loop.run_in_executor(
-                self.executor,
-                self._execute_sync,
+            # Execute query in the shared default thread pool to avoid blocking
+            rows, columns, row_count = await asyncio.to_thread(
+                db_manager.execute_query,
                 query,
                 database
             )
@@ -104,24 +125,10 @@ class QueryExecutor:
             
             # Format results
             if rows is not None:
-                # Convert rows to list of dicts
-                data = []
-                for row in rows:
-                    row_dict = {}
-                    for i, col in enumerate(columns):
-                        value = row[i]
-                        # Handle datetime objects
-                        if isinstance(value, datetime):
-                            value = value.isoformat()
-                        # Handle bytes
-                        elif isinstance(value, bytes):
-                            value = value.decode('utf-8', errors='ignore')
-                        row_dict[col] = value
-                    data.append(row_dict)
-                
+                # Keep rows as plain arrays; dicts are only built for 'records'
                 result = {
                     "success": True,
-                    "data": data,
+                    "rows": [self._convert_row(row) for row in rows],
                     "columns": columns,
                     "row_count": row_count,
                     "execution_time": round(execution_time, 3),
@@ -130,7 +137,7 @@ class QueryExecutor:
             else:
                 result = {
                     "success": True,
-                    "data": None,
+                    "rows": None,
                     "columns": None,
                     "row_count": row_count,
                     "execution_time": round(execution_time, 3),
@@ -163,10 +170,9 @@ class QueryExecutor:
                 logger.error(f"Failed to track analytics: {e}")
             
             # Cache successful SELECT results
-            query_cache.set(query, result, database)
-            result['from_cache'] = False
+            await query_cache.set_async(query, result, database)
             
-            return result
+            return self._shape_result(dict(result, from_cache=False), format)
             
         except Exception as e:
             execution_time = time.time() - start_time
@@ -207,33 +213,118 @@ class QueryExecutor:
             }
         
         finally:
-            # Remove from active queries
-            if session_id and session_id in self.active_queries:
-                self.active_queries[session_id]["active"] = False
+            # Remove from active queries and free the session slot
+            if session_id:
+                running = self.active_queries.get(session_id)
+                if running is not None:
+                    running.pop(query_id, None)
+                    if not running:
+                        del self.active_queries[session_id]
+                self._release_slot(session_id)
     
-    def _execute_sync(self, query: str, database: Optional[str] = None):
-        """Synchronous query execution (runs in thread pool)"""
-        return db_manager.execute_query(query, database)
+    async def _acquire_slot(self, session_id: str) -> None:
+        """Wait for one of the session's MAX_CONCURRENT_QUERIES slots"""
+        slot = self._session_slots.get(session_id)
+        if slot is None:
+            slot = self._session_slots[session_id] = asyncio.Semaphore(config.MAX_CONCURRENT_QUERIES)
+        self._slot_users[session_id] = self._slot_users.get(session_id, 0) + 1
+        try:
+            await slot.acquire()
+        except BaseException:
+            self._drop_slot_user(session_id)
+            raise
+    
+    def _release_slot(self, session_id: str) -> None:
+        """Return a slot taken by _acquire_slot"""
+        self._session_slots[session_id].release()
+        self._drop_slot_user(session_id)
+    
+    def _drop_slot_user(self, session_id: str) -> None:
+        """Forget the session's semaphore once nobody holds or awaits it"""
+        users = self._slot_users[session_id] - 1
+        if users:
+            self._slot_users[session_id] = users
+        else:
+            del self._slot_users[session_id]
+            del self._session_slots[session_id]
+    
+    @staticmethod
+    def _convert_row(row) -> list:
+        """Convert a result row into a JSON-friendly list"""
+        values = []
+        for value in row:
+            # Handle datetime objects
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            # Handle bytes
+            elif isinstance(value, bytes):
+                value = value.decode('utf-8', errors='ignore')
+            values.append(value)
+        return values
+    
+    @staticmethod
+    def _shape_result(result: Dict[str, Any], format: str) -> Dict[str, Any]:
+        """Return result in the requested shape ('records' or 'tabular')"""
+        if format == "tabular":
+            return result
+        
+        rows = result.pop("rows", None)
+        columns = result.get("columns")
+        result["data"] = (
+            [dict(zip(columns, row)) for row in rows] if rows is not None else None
+        )
+        return result
     
     async def execute_multiple(
         self,
         queries: list,
         database: Optional[str] = None,
         session_id: Optional[str] = None,
-        confirm_destructive: bool = False
+        confirm_destructive: bool = False,
+        format: str = "records"
     ) -> list:
         """
-        Execute multiple queries sequentially
+        Execute multiple queries
+        
+        Batches made up only of read-only SELECTs run concurrently, bounded
+        by the session's MAX_CONCURRENT_QUERIES slots (shared with its other
+        requests); anything else runs sequentially. Either way the returned
+        list stops at the first failed query.
         
         Args:
             queries: List of SQL queries
             database: Target database
             session_id: User session identifier
             confirm_destructive: Whether user confirmed destructive operations
+            format: Result shape, see execute()
             
         Returns:
             List of execution results
         """
+        if len(queries) > 1 and all(query_validator.is_read_only(q) for q in queries):
+            # With a session, _execute waits on its shared slots; without one, bound the batch locally
+            semaphore = None if session_id else asyncio.Semaphore(config.MAX_CONCURRENT_QUERIES)
+            
+            async def run(query: str) -> Dict[str, Any]:
+                if semaphore is None:
+                    return await self._execute(
+                        query, database, session_id, confirm_destructive, format,
+                        wait_for_slot=True
+                    )
+                async with semaphore:
+                    return await self._execute(
+                        query, database, session_id, confirm_destructive, format,
+                        wait_for_slot=True
+                    )
+            
+            results = await asyncio.gather(*(run(q) for q in queries))
+            
+            # Keep stop-on-first-error semantics
+            for i, result in enumerate(results):
+                if not result.get("success"):
+                    return results[:i + 1]
+            return results
+        
         results = []
         
         for query in queries:
@@ -241,7 +332,8 @@ class QueryExecutor:
                 query=query,
                 database=database,
                 session_id=session_id,
-                confirm_destructive=confirm_destructive
+                confirm_destructive=confirm_destructive,
+                format=format
             )
             results.append(result)
             
@@ -254,13 +346,10 @@ class QueryExecutor:
     def get_active_queries(self, session_id: Optional[str] = None) -> list:
         """Get list of active queries, optionally filtered by session"""
         if session_id:
-            return [
-                info for sid, info in self.active_queries.items()
-                if sid == session_id and info.get("active", False)
-            ]
+            return list(self.active_queries.get(session_id, {}).values())
         return [
-            info for info in self.active_queries.values()
-            if info.get("active", False)
+            info for running in self.active_queries.values()
+            for info in running.values()
         ]
 
 
@@ -2,11 +2,105 @@
 SQL Query Formatter Service
 """
 import sqlparse
-from typing import Dict, Any
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Outputs produced by format(), keyed by (formatted_query, *options) -> statement count.
+# Re-formatting one of these is treated as a no-op (format-on-keystroke round trips).
+_FORMATTED_OUTPUTS_MAX = 512
+_formatted_outputs: "OrderedDict[tuple, int]" = OrderedDict()
+
+
+def _remember_formatted(formatted: str, options: tuple, statement_count: int) -> None:
+    """Record a formatted output so formatting it again can be skipped"""
+    key = (formatted,) + options
+    _formatted_outputs[key] = statement_count
+    _formatted_outputs.move_to_end(key)
+    while len(_formatted_outputs) > _FORMATTED_OUTPUTS_MAX:
+        _formatted_outputs.popitem(last=False)
+
+
+def _is_already_formatted(query: str, options: tuple) -> Optional[int]:
+    """Return the statement count if query is a known format() output, else None"""
+    return _formatted_outputs.get((query,) + options)
+
+
+@lru_cache(maxsize=512)
+def _count_statements(query: str, strip_comments: bool) -> int:
+    """
+    Count statements that contain anything besides whitespace (and, when
+    comments are being stripped, besides comments). Only the count is cached.
+    """
+    count = 0
+    # FilterStack yields ungrouped statements, which is all a count needs
+    for statement in sqlparse.engine.FilterStack().run(query):
+        for token in statement.tokens:
+            if token.is_whitespace:
+                continue
+            if strip_comments and token.ttype in sqlparse.tokens.Comment:
+                continue
+            count += 1
+            break
+    return count
+
+
+@lru_cache(maxsize=512)
+def _format_cached(
+    query: str,
+    keyword_case: str,
+    identifier_case: Optional[str],
+    indent_width: int,
+    strip_comments: bool
+) -> str:
+    """Run sqlparse.format once per distinct query/options combination"""
+    return sqlparse.format(
+        query,
+        reindent=True,
+        keyword_case=keyword_case,
+        identifier_case=identifier_case,
+        indent_width=indent_width,
+        strip_comments=strip_comments,
+        strip_whitespace=True
+    )
+
+
+@lru_cache(maxsize=512)
+def _minify_cached(query: str) -> str:
+    """Strip comments and collapse whitespace, cached per query"""
+    minified = sqlparse.format(
+        query,
+        strip_whitespace=True,
+        strip_comments=True
+    )
+    # Further compress
+    return ' '.join(minified.split())
+
+
+@lru_cache(maxsize=512)
+def _analyze_cached(query: str) -> Optional[Tuple[Optional[str], Tuple[Tuple[str, str], ...], int]]:
+    """
+    Parse query once and return (statement_type, tokens, statement_count)
+    
+    Tokens are (type, value) pairs for the first 20 non-whitespace tokens
+    of the first statement. Returns None if nothing could be parsed.
+    """
+    parsed = sqlparse.parse(query)
+    if not parsed:
+        return None
+    
+    statement = parsed[0]
+    tokens = tuple(
+        (str(token.ttype) if token.ttype else 'Group', str(token)[:50])
+        for token in statement.tokens
+        if not token.is_whitespace
+    )[:20]  # Limit to first 20
+    
+    return statement.get_type(), tokens, len(parsed)
+
 
 class QueryFormatter:
     """Formats and beautifies SQL queries"""
@@ -44,20 +138,25 @@ class QueryFormatter:
         Returns:
             Dict with formatted query and metadata
         """
+        options = (keyword_case, identifier_case, indent_width, strip_comments)
+        
+        # Skip sqlparse entirely when re-formatting our own output
+        known_count = _is_already_formatted(query, options)
+        if known_count is not None:
+            return {
+                'success': True,
+                'formatted': query,
+                'original': query,
+                'statement_count': known_count,
+                'changes_made': False
+            }
+        
         try:
-            formatted = sqlparse.format(
-                query,
-                reindent=True,
-                keyword_case=keyword_case,
-                identifier_case=identifier_case,
-                indent_width=indent_width,
-                strip_comments=strip_comments,
-                strip_whitespace=True
-            )
+            formatted = _format_cached(query, *options)
             
-            # Count statements
-            statements = sqlparse.split(formatted)
-            statement_count = len([s for s in statements if s.strip()])
+            # Count statements from the input; comments only count if kept
+            statement_count = _count_statements(query, strip_comments)
+            _remember_formatted(formatted, options, statement_count)
             
             return {
                 'success': True,
@@ -87,13 +186,7 @@ class QueryFormatter:
             Dict with minified query
         """
         try:
-            minified = sqlparse.format(
-                query,
-                strip_whitespace=True,
-                strip_comments=True
-            )
-            # Further compress
-            minified = ' '.join(minified.split())
+            minified = _minify_cached(query)
             
             return {
                 'success': True,
@@ -121,33 +214,21 @@ class QueryFormatter:
             Dict with query analysis
         """
         try:
-            parsed = sqlparse.parse(query)
+            analysis = _analyze_cached(query)
             
-            if not parsed:
+            if analysis is None:
                 return {
                     'success': False,
                     'error': 'Could not parse query'
                 }
             
-            statement = parsed[0]
-            
-            # Determine statement type
-            stmt_type = statement.get_type()
-            
-            # Extract tokens info
-            tokens_info = []
-            for token in statement.tokens:
-                if not token.is_whitespace:
-                    tokens_info.append({
-                        'type': str(token.ttype) if token.ttype else 'Group',
-                        'value': str(token)[:50]
-                    })
+            stmt_type, tokens, statement_count = analysis
             
             return {
                 'success': True,
                 'type': stmt_type,
-                'tokens': tokens_info[:20],  # Limit to first 20
-                'statement_count': len(parsed),
+                'tokens': [{'type': t, 'value': v} for t, v in tokens],
+                'statement_count': statement_count,
                 'is_valid': True
             }
             
@@ -1,6 +1,11 @@
 import pyodbc
+import queue
 import secrets
 import string
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Tuple, Optional
 import logging
@@ -8,28 +13,186 @@ import config
 
 logger = logging.getLogger(__name__)
 
+# How long to wait for a newly created database to come ONLINE (seconds)
+DB_ONLINE_TIMEOUT = 5.0
+DB_ONLINE_POLL_INTERVAL = 0.1
+
+# Short-lived memoization of per-sandbox lookups (existence, size)
+SANDBOX_INFO_TTL = 5.0
+SANDBOX_INFO_CACHE_SIZE = 1024
+
+_MISSING = object()
+
+# Parameterized admin lookups; constant statement text lets SQL Server reuse one cached plan
+_SQL_DATABASE_EXISTS = "SELECT COUNT(*) FROM sys.databases WHERE name = ?"
+_SQL_DATABASE_SIZE = (
+    "SELECT SUM(size) * 8.0 / 1024 FROM sys.master_files WHERE database_id = DB_ID(?)"
+)
+
+# Password character classes (ASCII bytes, indexed directly by random bytes)
+_PW_UPPER = string.ascii_uppercase.encode()
+_PW_LOWER = string.ascii_lowercase.encode()
+_PW_DIGITS = string.digits.encode()
+_PW_SYMBOLS = b"!@#$%^&*"
+_PW_ALPHABET = string.ascii_letters.encode() + _PW_DIGITS + _PW_SYMBOLS
+# OS-backed RNG, shared rather than constructed per password
+_SYSTEM_RANDOM = secrets.SystemRandom()
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after a fixed TTL"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, default=None):
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value) -> None:
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: str) -> None:
+        """Drop a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class AdminConnectionPool:
+    """Bounded LIFO pool of admin pyodbc connections"""
+    
+    def __init__(self, connection_string: str, max_size: int = 5):
+        self.connection_string = connection_string
+        self._pool: "queue.LifoQueue[pyodbc.Connection]" = queue.LifoQueue(maxsize=max_size)
+    
+    def _connect(self) -> pyodbc.Connection:
+        """Open a new admin connection with friendly error messages"""
+        try:
+            logger.info(f"Attempting connection to SQL Server: {config.DB_SERVER}")
+            return pyodbc.connect(self.connection_string, timeout=30)
+            
+        except pyodbc.Error as e:
+            error_msg = str(e)
+            logger.error(f"SQL Server connection failed: {error_msg}")
+            logger.error(f"Server: {config.DB_SERVER}, Database: {config.DB_DATABASE}")
+            
+            # Provide specific error messages
+            if "Login failed" in error_msg:
+                raise Exception("SQL Server authentication failed. Check credentials or use Windows Authentication.")
+            elif "Server not found" in error_msg or "Named Pipes" in error_msg:
+                raise Exception(f"Cannot reach SQL Server '{config.DB_SERVER}'. Check server name and network connectivity.")
+            elif "timeout" in error_msg.lower():
+                raise Exception(f"SQL Server connection timeout. Server '{config.DB_SERVER}' may be unreachable.")
+            else:
+                raise Exception(f"SQL Server error: {error_msg}")
+    
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection, returning it to the pool afterwards
+        
+        Connections are committed (unless in autocommit) and reset to
+        autocommit off on release. A connection that saw an error is
+        closed rather than reused, so dead connections recycle themselves.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        
+        try:
+            yield conn
+            if not conn.autocommit:
+                conn.commit()
+            conn.autocommit = False
+        except Exception:
+            self._discard(conn)
+            raise
+        
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+    
+    @staticmethod
+    def _discard(conn: pyodbc.Connection) -> None:
+        """Close a connection, ignoring errors"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
 
 class SQLServerProvisioner:
     """Provisions SQL Server databases and logins for sandbox users"""
     
     def __init__(self):
         self.admin_connection_string = config.CONNECTION_STRING
+        self._pool = AdminConnectionPool(
+            self.admin_connection_string,
+            max_size=config.ADMIN_POOL_SIZE
+        )
+        # UI polling hits these per request; database state rarely changes mid-session
+        self._exists_cache = TTLCache(SANDBOX_INFO_CACHE_SIZE, SANDBOX_INFO_TTL)
+        self._size_cache = TTLCache(SANDBOX_INFO_CACHE_SIZE, SANDBOX_INFO_TTL)
+    
+    def _invalidate_sandbox_info(self, database_name: str) -> None:
+        """Forget cached existence/size results for a database"""
+        self._exists_cache.pop(database_name)
+        self._size_cache.pop(database_name)
     
     def generate_secure_password(self, length: int = 16) -> str:
         """Generate a secure random password"""
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-        # Ensure at least one of each type
-        password = [
-            secrets.choice(string.ascii_uppercase),
-            secrets.choice(string.ascii_lowercase),
-            secrets.choice(string.digits),
-            secrets.choice("!@#$%^&*")
+        if length < 4:
+            raise ValueError("Password length must be at least 4 (one of each character class)")
+        
+        # Ensure at least one of each type, then fill the rest
+        picks = [
+            (_PW_UPPER, 1),
+            (_PW_LOWER, 1),
+            (_PW_DIGITS, 1),
+            (_PW_SYMBOLS, 1),
+            (_PW_ALPHABET, length - 4)
         ]
-        # Fill the rest
-        password += [secrets.choice(alphabet) for _ in range(length - 4)]
+        
+        # One urandom read up front; bytes are mapped onto each alphabet with
+        # rejection sampling so every character stays uniformly distributed
+        raw = secrets.token_bytes(length * 2)
+        pos = 0
+        password = bytearray()
+        for alphabet, count in picks:
+            size = len(alphabet)
+            limit = 256 - (256 % size)
+            while count > 0:
+                if pos == len(raw):
+                    raw = secrets.token_bytes(length)
+                    pos = 0
+                byte = raw[pos]
+                pos += 1
+                if byte < limit:
+                    password.append(alphabet[byte % size])
+                    count -= 1
+        
         # Shuffle
-        secrets.SystemRandom().shuffle(password)
-        return ''.join(password)
+        _SYSTEM_RANDOM.shuffle(password)
+        return password.decode('ascii')
     
     def create_sandbox_environment(self, username: str) -> Tuple[str, str, str]:
         """
@@ -66,82 +229,82 @@ class SQLServerProvisioner:
                 safe_db_name = database_name.replace(']', ']]')
                 cursor.execute(f"CREATE DATABASE [{safe_db_name}]")
                 
-                # Wait for database creation to complete
-                cursor.execute("WAITFOR DELAY '00:00:03'")
-                conn.commit()
+                # Wait until the database is ONLINE instead of sleeping a fixed time
+                self._wait_until_online(cursor, database_name)
 
-                # Set database size limit (100MB max for data, 50MB for log) - best-effort using a fresh connection
+                # Set database size limit (100MB max for data, 50MB for log) - best-effort.
+                # One batch builds and runs MODIFY FILE for every file of the database.
                 try:
-                    # Open a fresh connection so metadata for the new DB is visible
-                    with self._get_admin_connection() as conn2:
-                        conn2.autocommit = True
-                        cursor2 = conn2.cursor()
+                    cursor.execute("""
+                        SET NOCOUNT ON;
+                        DECLARE @db sysname = ?;
+                        DECLARE @sql nvarchar(max) = N'';
+                        DECLARE @files int = 0;
+
+                        -- 'ROWS' for data (100MB, grow 10MB), otherwise log (50MB, grow 5MB)
+                        SELECT
+                            @sql += N'ALTER DATABASE ' + QUOTENAME(@db)
+                                + N' MODIFY FILE (NAME = ' + QUOTENAME(name, '''')
+                                + CASE type_desc
+                                    WHEN 'ROWS' THEN N', MAXSIZE = 100MB, FILEGROWTH = 10MB);'
+                                    ELSE N', MAXSIZE = 50MB, FILEGROWTH = 5MB);'
+                                  END,
+                            @files += 1
+                        FROM sys.master_files
+                        WHERE database_id = DB_ID(@db);
 
-                        # Get logical file names and types for the new database
-                        cursor2.execute(f"""
-                            SELECT name, type_desc FROM sys.master_files 
-                            WHERE database_id = DB_ID('{safe_db_name}');
-                        """)
-                        files = cursor2.fetchall()
+                        IF @files > 0 EXEC sp_executesql @sql;
+                        SELECT @files;
+                    """, database_name)
+                    file_count = cursor.fetchone()[0]
 
-                        if files:
-                            for file in files:
-                                file_name = file[0]
-                                file_type = file[1]  # 'ROWS' for data, 'LOG' for log
-                                # Choose sensible limits per file type
-                                if file_type == "ROWS":
-                                    size_limit = "100MB"
-                                    growth = "10MB"  # Grow by 10MB at a time
-                                else:  # LOG file
-                                    size_limit = "50MB"
-                                    growth = "5MB"   # Grow by 5MB at a time
-                                
-                                logger.info(f"Setting size limit for file {file_name} ({file_type})")
-                                cursor2.execute(f"""
-                                    ALTER DATABASE [{safe_db_name}]
-                                    MODIFY FILE (NAME = N'{file_name}', MAXSIZE = {size_limit}, FILEGROWTH = {growth});
-                                """)
-                            logger.info(f"Set size limits for {database_name} (data=100MB, log=50MB)")
-                        else:
-                            logger.warning(f"No files found for {safe_db_name}, skipping size limit")
+                    if file_count:
+                        logger.info(f"Set size limits for {database_name} (data=100MB, log=50MB)")
+                    else:
+                        logger.warning(f"No files found for {safe_db_name}, skipping size limit")
                 except Exception as e:
                     logger.warning(f"Could not set size limit for {database_name}: {e}")
                 
-                # 3. Switch to the new database context
-                cursor.execute(f"USE [{safe_db_name}]")
-                
-                # 4. Create user in the new database
-                cursor.execute(f"CREATE USER [{safe_login}] FOR LOGIN [{safe_login}]")
-                
-                # 5. Grant permissions (limited but functional)
-                # Allow creating/modifying tables, views, procedures
-                cursor.execute(f"ALTER ROLE db_datareader ADD MEMBER [{safe_login}]")
-                cursor.execute(f"ALTER ROLE db_datawriter ADD MEMBER [{safe_login}]")
-                cursor.execute(f"ALTER ROLE db_ddladmin ADD MEMBER [{safe_login}]")
-                
-                # 6. Grant additional specific permissions
-                cursor.execute(f"GRANT CREATE TABLE TO [{safe_login}]")
-                cursor.execute(f"GRANT CREATE VIEW TO [{safe_login}]")
-                cursor.execute(f"GRANT CREATE PROCEDURE TO [{safe_login}]")
-                cursor.execute(f"GRANT CREATE FUNCTION TO [{safe_login}]")
-                
-                # 7. Note: User is already restricted to their sandbox database
-                # Additional restrictions are enforced at the SQL Server level
-                # The db_ddladmin role allows DDL operations within this database only
-                
-                # 8. Create a welcome table
-                cursor.execute(f"""
+                # 3-8. Set up the database in a single round-trip. sp_executesql
+                # on the sandbox's own sys schema runs the batch in that database
+                # without switching this (pooled) connection's context.
+                setup_batch = f"""
+                    SET NOCOUNT ON;
+                    
+                    -- 4. Create user in the new database
+                    CREATE USER [{safe_login}] FOR LOGIN [{safe_login}];
+                    
+                    -- 5. Grant permissions (limited but functional)
+                    -- Allow creating/modifying tables, views, procedures
+                    ALTER ROLE db_datareader ADD MEMBER [{safe_login}];
+                    ALTER ROLE db_datawriter ADD MEMBER [{safe_login}];
+                    ALTER ROLE db_ddladmin ADD MEMBER [{safe_login}];
+                    
+                    -- 6. Grant additional specific permissions
+                    GRANT CREATE TABLE TO [{safe_login}];
+                    GRANT CREATE VIEW TO [{safe_login}];
+                    GRANT CREATE PROCEDURE TO [{safe_login}];
+                    GRANT CREATE FUNCTION TO [{safe_login}];
+                    
+                    -- 7. Note: User is already restricted to their sandbox database
+                    -- Additional restrictions are enforced at the SQL Server level
+                    -- The db_ddladmin role allows DDL operations within this database only
+                    
+                    -- 8. Create a welcome table
                     CREATE TABLE Welcome (
                         id INT PRIMARY KEY IDENTITY(1,1),
                         message NVARCHAR(200),
                         created_at DATETIME DEFAULT GETDATE()
-                    )
-                """)
-                cursor.execute(f"""
+                    );
                     INSERT INTO Welcome (message) 
-                    VALUES ('Welcome to your SQL Playground sandbox! Feel free to experiment.')
-                """)
+                    VALUES ('Welcome to your SQL Playground sandbox! Feel free to experiment.');
+                """
+                cursor.execute(f"EXEC [{safe_db_name}].sys.sp_executesql ?", setup_batch)
+                # Drain remaining results so errors from later statements surface
+                while cursor.nextset():
+                    pass
                 
+                self._invalidate_sandbox_info(database_name)
                 logger.info(f"Successfully created sandbox environment for {username}")
                 return database_name, sql_login, sql_password
                 
@@ -151,6 +314,19 @@ class SQLServerProvisioner:
             self._cleanup_failed_provisioning(database_name, sql_login)
             raise Exception(f"Failed to provision sandbox: {str(e)}")
     
+    def _wait_until_online(self, cursor, database_name: str) -> None:
+        """Poll sys.databases until the new database reports ONLINE"""
+        deadline = time.monotonic() + DB_ONLINE_TIMEOUT
+        while True:
+            cursor.execute("SELECT state_desc FROM sys.databases WHERE name = ?", database_name)
+            row = cursor.fetchone()
+            if row and row[0] == 'ONLINE':
+                return
+            if time.monotonic() >= deadline:
+                logger.warning(f"Database {database_name} not ONLINE after {DB_ONLINE_TIMEOUT}s, continuing")
+                return
+            time.sleep(DB_ONLINE_POLL_INTERVAL)
+    
     def cleanup_sandbox_environment(self, database_name: str, sql_login: str) -> None:
         """
         Completely remove a sandbox environment
@@ -164,43 +340,55 @@ class SQLServerProvisioner:
                 conn.autocommit = True
                 cursor = conn.cursor()
                 
-                # 1. Kill all connections to the database
-                logger.info(f"Killing connections to {database_name}")
-                safe_db_name = database_name.replace(']', ']]')
-                cursor.execute(f"""
-                    DECLARE @kill varchar(max) = '';
-                    SELECT @kill = @kill + 'KILL ' + CONVERT(varchar(5), session_id) + ';'
-                    FROM sys.dm_exec_sessions
-                    WHERE database_id = DB_ID('{safe_db_name}');
-                    EXEC(@kill);
-                """)
-                
-                # 2. Drop the database
-                logger.info(f"Dropping database: {database_name}")
-                try:
-                    cursor.execute(f"""
-                        IF EXISTS (SELECT name FROM sys.databases WHERE name = N'{safe_db_name}')
-                        DROP DATABASE [{safe_db_name}]
-                    """)
-                except Exception as e:
-                    logger.warning(f"Could not drop database: {e}")
-                
-                # 3. Drop the SQL Server login
-                logger.info(f"Dropping login: {sql_login}")
-                safe_login = sql_login.replace(']', ']]')
-                try:
-                    cursor.execute(f"""
-                        IF EXISTS (SELECT name FROM sys.server_principals WHERE name = N'{safe_login}')
-                        DROP LOGIN [{safe_login}]
-                    """)
-                except Exception as e:
-                    logger.warning(f"Could not drop login: {e}")
+                # One batch: force other sessions out with SINGLE_USER ... ROLLBACK
+                # IMMEDIATE, drop the database, then drop the login. Names are bound
+                # as parameters and quoted server-side; each step is best-effort.
+                logger.info(f"Dropping database {database_name} and login {sql_login}")
+                cursor.execute("""
+                    SET NOCOUNT ON;
+                    DECLARE @db sysname = ?;
+                    DECLARE @login sysname = ?;
+                    DECLARE @sql nvarchar(max);
+                    DECLARE @errors nvarchar(max) = N'';
+
+                    IF DB_ID(@db) IS NOT NULL
+                    BEGIN
+                        BEGIN TRY
+                            SET @sql = N'ALTER DATABASE ' + QUOTENAME(@db)
+                                + N' SET SINGLE_USER WITH ROLLBACK IMMEDIATE;'
+                                + N' DROP DATABASE ' + QUOTENAME(@db) + N';';
+                            EXEC sp_executesql @sql;
+                        END TRY
+                        BEGIN CATCH
+                            SET @errors += N'database: ' + ERROR_MESSAGE() + N' ';
+                        END CATCH;
+                    END;
+
+                    IF SUSER_ID(@login) IS NOT NULL
+                    BEGIN
+                        BEGIN TRY
+                            SET @sql = N'DROP LOGIN ' + QUOTENAME(@login) + N';';
+                            EXEC sp_executesql @sql;
+                        END TRY
+                        BEGIN CATCH
+                            SET @errors += N'login: ' + ERROR_MESSAGE();
+                        END CATCH;
+                    END;
+
+                    SELECT @errors;
+                """, database_name, sql_login)
+                errors = cursor.fetchone()[0]
+                if errors:
+                    logger.warning(f"Could not fully clean up sandbox {database_name}: {errors}")
+                    return
                 
                 logger.info(f"Successfully cleaned up sandbox: {database_name}")
                 
         except pyodbc.Error as e:
             logger.error(f"Error during sandbox cleanup: {e}")
             # Don't raise - cleanup is best-effort
+        finally:
+            self._invalidate_sandbox_info(database_name)
     
     def _cleanup_failed_provisioning(self, database_name: str, sql_login: str):
         """Cleanup after failed provisioning attempt"""
@@ -210,65 +398,46 @@ class SQLServerProvisioner:
             logger.error(f"Failed to cleanup after provisioning error: {e}")
     
     def _get_admin_connection(self):
-        """Get admin connection to SQL Server with enhanced error handling"""
-        try:
-            logger.info(f"Attempting connection to SQL Server: {config.DB_SERVER}")
-            conn = pyodbc.connect(self.admin_connection_string, timeout=30)
-            
-            # Test the connection immediately
-            cursor = conn.cursor()
-            cursor.execute("SELECT @@VERSION")
-            version = cursor.fetchone()[0]
-            logger.info(f"Connected to SQL Server successfully")
-            return conn
-            
-        except pyodbc.Error as e:
-            error_msg = str(e)
-            logger.error(f"SQL Server connection failed: {error_msg}")
-            logger.error(f"Server: {config.DB_SERVER}, Database: {config.DB_DATABASE}")
-            
-            # Provide specific error messages
-            if "Login failed" in error_msg:
-                raise Exception("SQL Server authentication failed. Check credentials or use Windows Authentication.")
-            elif "Server not found" in error_msg or "Named Pipes" in error_msg:
-                raise Exception(f"Cannot reach SQL Server '{config.DB_SERVER}'. Check server name and network connectivity.")
-            elif "timeout" in error_msg.lower():
-                raise Exception(f"SQL Server connection timeout. Server '{config.DB_SERVER}' may be unreachable.")
-            else:
-                raise Exception(f"SQL Server error: {error_msg}")
+        """Check out a pooled admin connection (use as a context manager)"""
+        return self._pool.connection()
     
     def verify_sandbox_exists(self, database_name: str) -> bool:
-        """Check if a sandbox database exists"""
+        """Check if a sandbox database exists (memoized for SANDBOX_INFO_TTL seconds)"""
+        cached = self._exists_cache.get(database_name, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
         try:
             with self._get_admin_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT COUNT(*) as count 
-                    FROM sys.databases 
-                    WHERE name = ?
-                """, (database_name,))
+                cursor.execute(_SQL_DATABASE_EXISTS, (database_name,))
                 result = cursor.fetchone()
-                return result[0] > 0
+                exists = result[0] > 0
         except Exception as e:
             logger.error(f"Error checking sandbox existence: {e}")
             return False
+        
+        self._exists_cache.set(database_name, exists)
+        return exists
     
     def get_database_size(self, database_name: str) -> Optional[float]:
-        """Get database size in MB"""
+        """Get database size in MB (memoized for SANDBOX_INFO_TTL seconds)"""
+        cached = self._size_cache.get(database_name, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
         try:
             with self._get_admin_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(f"""
-                    SELECT 
-                        SUM(size) * 8.0 / 1024 as size_mb
-                    FROM sys.master_files
-                    WHERE database_id = DB_ID('{database_name}')
-                """)
+                cursor.execute(_SQL_DATABASE_SIZE, (database_name,))
                 result = cursor.fetchone()
-                return result[0] if result else None
+                size_mb = result[0] if result else None
         except Exception as e:
             logger.error(f"Error getting database size: {e}")
             return None
+        
+        self._size_cache.set(database_name, size_mb)
+        return size_mb
 
 
 # Global instance
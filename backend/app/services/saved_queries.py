@@ -3,6 +3,12 @@ Saved Queries Service - Manages user's saved query templates
 """
 import sqlite3
 import json
+import queue
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from pathlib import Path
@@ -13,16 +19,114 @@ logger = logging.getLogger(__name__)
 # Database path
 DB_PATH = Path(__file__).parent.parent.parent / "saved_queries.db"
 
+# Maximum number of idle SQLite connections kept open
+POOL_MAX = 5
+
+# Use-count increments are written in batches by a background thread
+USE_COUNT_FLUSH_INTERVAL = 0.1  # seconds to gather increments per batch
+USE_COUNT_BATCH_MAX = 500
+
+# INSERT/UPDATE ... RETURNING needs SQLite 3.35+; older builds re-read the row
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Full-text index over the searchable columns, kept in sync by triggers
+_FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS saved_queries_fts USING fts5(
+        name, description, query,
+        content='saved_queries', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS saved_queries_fts_ai AFTER INSERT ON saved_queries BEGIN
+        INSERT INTO saved_queries_fts(rowid, name, description, query)
+        VALUES (new.id, new.name, new.description, new.query);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS saved_queries_fts_ad AFTER DELETE ON saved_queries BEGIN
+        INSERT INTO saved_queries_fts(saved_queries_fts, rowid, name, description, query)
+        VALUES ('delete', old.id, old.name, old.description, old.query);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS saved_queries_fts_au
+    AFTER UPDATE OF name, description, query ON saved_queries BEGIN
+        INSERT INTO saved_queries_fts(saved_queries_fts, rowid, name, description, query)
+        VALUES ('delete', old.id, old.name, old.description, old.query);
+        INSERT INTO saved_queries_fts(rowid, name, description, query)
+        VALUES (new.id, new.name, new.description, new.query);
+    END
+    """,
+]
+
+
+@dataclass
+class SavedQueryRecord:
+    """A saved_queries row; fields follow the table's column order"""
+    __slots__ = (
+        'id', 'user_id', 'name', 'description', 'query', 'database_name',
+        'tags_json', 'is_favorite', 'use_count', 'created_at', 'updated_at'
+    )
+    
+    id: int
+    user_id: Optional[int]
+    name: str
+    description: Optional[str]
+    query: str
+    database_name: Optional[str]
+    tags_json: Optional[str]  # Raw JSON; parsed on demand by .tags
+    is_favorite: int
+    use_count: int
+    created_at: str
+    updated_at: str
+    
+    @property
+    def tags(self) -> List[str]:
+        """Tags list, decoded from JSON only when accessed"""
+        if not self.tags_json:
+            return []
+        try:
+            return json.loads(self.tags_json)
+        except json.JSONDecodeError:
+            return []
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """API representation (tags decoded, is_favorite as bool)"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'description': self.description,
+            'query': self.query,
+            'database_name': self.database_name,
+            'tags': self.tags,
+            'is_favorite': bool(self.is_favorite),
+            'use_count': self.use_count,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
 
 class SavedQueriesService:
     """Manages saved query templates"""
     
     def __init__(self):
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=POOL_MAX)
+        self._fts_enabled = False
         self._init_database()
+        
+        # The writer thread is started on the first increment_use_count()
+        self._use_counts: "queue.Queue[tuple]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
     
     def _init_database(self):
         """Initialize SQLite database for saved queries"""
-        with sqlite3.connect(DB_PATH) as conn:
+        with self._conn() as conn:
+            # WAL lets readers proceed while a write is in progress (persists in the file)
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS saved_queries (
@@ -40,20 +144,89 @@ class SavedQueriesService:
                 )
             """)
             
-            # Create index for faster lookups
+            # Listing filters on user_id and sorts by updated_at; these indexes
+            # serve both, so no sort step is needed (favorites get a partial index)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_saved_queries_user_updated 
+                ON saved_queries(user_id, updated_at DESC)
+            """)
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_saved_queries_user 
-                ON saved_queries(user_id)
+                CREATE INDEX IF NOT EXISTS idx_saved_queries_user_fav 
+                ON saved_queries(user_id, updated_at DESC)
+                WHERE is_favorite = 1
             """)
+            # Superseded by idx_saved_queries_user_updated (same leading column)
+            cursor.execute("DROP INDEX IF EXISTS idx_saved_queries_user")
+            
+            self._fts_enabled = self._init_fts(cursor)
             
             conn.commit()
     
-    def get_connection(self):
-        """Get database connection with row factory"""
-        conn = sqlite3.connect(DB_PATH)
+    def _init_fts(self, cursor: sqlite3.Cursor) -> bool:
+        """
+        Create the FTS5 search index and its sync triggers
+        
+        Returns:
+            True if full-text search is available, False to fall back to LIKE
+        """
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'saved_queries_fts'"
+        )
+        existed = cursor.fetchone() is not None
+        
+        try:
+            for statement in _FTS_SCHEMA:
+                cursor.execute(statement)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, saved query search will use LIKE: {e}")
+            return False
+        
+        if not existed:
+            # Index rows saved before the FTS table existed
+            cursor.execute("INSERT INTO saved_queries_fts(saved_queries_fts) VALUES ('rebuild')")
+        
+        return True
+    
+    @staticmethod
+    def _fts_match_expression(search: str) -> Optional[str]:
+        """
+        Turn free-text input into an FTS5 prefix phrase query
+        
+        The input is quoted as a single phrase so FTS5 operators typed by the
+        user are treated as text; the trailing * lets the last word match as
+        a prefix (e.g. "sel" finds "SELECT").
+        """
+        if not any(ch.isalnum() for ch in search):
+            return None
+        return '"' + search.replace('"', '""') + '"*'
+    
+    def _new_connection(self) -> sqlite3.Connection:
+        """Open a configured SQLite connection"""
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
         return conn
     
+    @contextmanager
+    def _conn(self):
+        """Borrow a pooled connection, returning it to the pool afterwards"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection()
+        
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
     def save_query(
         self,
         user_id: int,
@@ -63,7 +236,7 @@ class SavedQueriesService:
         database_name: Optional[str] = None,
         tags: Optional[List[str]] = None,
         is_favorite: bool = False
-    ) -> Dict[str, Any]:
+    ) -> SavedQueryRecord:
         """
         Save a query template
         
@@ -77,28 +250,82 @@ class SavedQueriesService:
             is_favorite: Whether to mark as favorite
             
         Returns:
-            Saved query dict
+            Saved query record
         """
         now = datetime.utcnow().isoformat()
         tags_json = json.dumps(tags) if tags else None
         
-        with self.get_connection() as conn:
+        returning = " RETURNING *" if _HAS_RETURNING else ""
+        
+        with self._conn() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO saved_queries 
                 (user_id, name, description, query, database_name, tags, is_favorite, created_at, updated_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (user_id, name, description, query, database_name, tags_json, 
+            """ + returning, (user_id, name, description, query, database_name, tags_json, 
                   1 if is_favorite else 0, now, now))
             
-            query_id = cursor.lastrowid
+            if not _HAS_RETURNING:
+                query_id = cursor.lastrowid
+                conn.commit()
+                return self.get_query(query_id)
+            
+            # Fetch before committing; RETURNING rows are produced as the statement steps
+            row = cursor.fetchone()
             conn.commit()
             
-            return self.get_query(query_id)
+            return self._row_to_record(row)
+    
+    def save_many(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Save several query templates in a single transaction
+        
+        Args:
+            rows: Dicts with the save_query() arguments (user_id, name, query
+                and optionally description, database_name, tags, is_favorite)
+            
+        Returns:
+            IDs of the saved queries, in input order
+        """
+        if not rows:
+            return []
+        
+        now = datetime.utcnow().isoformat()
+        params = [
+            (
+                row['user_id'], row['name'], row.get('description'), row['query'],
+                row.get('database_name'),
+                json.dumps(row['tags']) if row.get('tags') else None,
+                1 if row.get('is_favorite') else 0, now, now
+            )
+            for row in rows
+        ]
+        
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            # Take the write lock up front so the new ids are exactly those above the current max
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM saved_queries")
+            last_id = cursor.fetchone()[0]
+            
+            cursor.executemany("""
+                INSERT INTO saved_queries 
+                (user_id, name, description, query, database_name, tags, is_favorite, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, params)
+            
+            cursor.execute(
+                "SELECT id FROM saved_queries WHERE id > ? ORDER BY id", (last_id,)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+            
+            return ids
     
-    def get_query(self, query_id: int) -> Optional[Dict[str, Any]]:
+    def get_query(self, query_id: int) -> Optional[SavedQueryRecord]:
         """Get a saved query by ID"""
-        with self.get_connection() as conn:
+        with self._conn() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM saved_queries WHERE id = ?", (query_id,))
             row = cursor.fetchone()
@@ -106,7 +333,7 @@ class SavedQueriesService:
             if not row:
                 return None
             
-            return self._row_to_dict(row)
+            return self._row_to_record(row)
     
     def get_user_queries(
         self,
@@ -114,7 +341,7 @@ class SavedQueriesService:
         favorites_only: bool = False,
         search: Optional[str] = None,
         limit: int = 50
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SavedQueryRecord]:
         """
         Get all saved queries for a user
         
@@ -125,29 +352,39 @@ class SavedQueriesService:
             limit: Maximum number of results
             
         Returns:
-            List of saved query dicts
+            List of saved query records
         """
-        with self.get_connection() as conn:
+        with self._conn() as conn:
             cursor = conn.cursor()
             
-            query = "SELECT * FROM saved_queries WHERE user_id = ?"
-            params = [user_id]
+            match = self._fts_match_expression(search) if search and self._fts_enabled else None
             
-            if favorites_only:
-                query += " AND is_favorite = 1"
+            if match:
+                query = """
+                    SELECT s.* FROM saved_queries s
+                    JOIN saved_queries_fts f ON f.rowid = s.id
+                    WHERE s.user_id = ? AND saved_queries_fts MATCH ?
+                """
+                params = [user_id, match]
+            else:
+                query = "SELECT * FROM saved_queries s WHERE s.user_id = ?"
+                params = [user_id]
+                
+                if search:
+                    query += " AND (s.name LIKE ? OR s.description LIKE ? OR s.query LIKE ?)"
+                    search_pattern = f"%{search}%"
+                    params.extend([search_pattern, search_pattern, search_pattern])
             
-            if search:
-                query += " AND (name LIKE ? OR description LIKE ? OR query LIKE ?)"
-                search_pattern = f"%{search}%"
-                params.extend([search_pattern, search_pattern, search_pattern])
+            if favorites_only:
+                query += " AND s.is_favorite = 1"
             
-            query += " ORDER BY updated_at DESC LIMIT ?"
+            query += " ORDER BY s.updated_at DESC LIMIT ?"
             params.append(limit)
             
             cursor.execute(query, params)
             rows = cursor.fetchall()
             
-            return [self._row_to_dict(row) for row in rows]
+            return [self._row_to_record(row) for row in rows]
     
     def update_query(
         self,
@@ -159,7 +396,7 @@ class SavedQueriesService:
         database_name: Optional[str] = None,
         tags: Optional[List[str]] = None,
         is_favorite: Optional[bool] = None
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Optional[SavedQueryRecord]:
         """Update a saved query"""
         # Build update query dynamically
         updates = []
@@ -192,23 +429,33 @@ class SavedQueriesService:
         
         params.extend([query_id, user_id])
         
-        with self.get_connection() as conn:
+        returning = " RETURNING *" if _HAS_RETURNING else ""
+        
+        with self._conn() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 UPDATE saved_queries 
                 SET {', '.join(updates)}
                 WHERE id = ? AND user_id = ?
-            """, params)
+            """ + returning, params)
+            
+            if not _HAS_RETURNING:
+                conn.commit()
+                if cursor.rowcount == 0:
+                    return None
+                return self.get_query(query_id)
+            
+            row = cursor.fetchone()
             conn.commit()
             
-            if cursor.rowcount == 0:
+            if not row:
                 return None
             
-            return self.get_query(query_id)
+            return self._row_to_record(row)
     
     def delete_query(self, query_id: int, user_id: int) -> bool:
         """Delete a saved query"""
-        with self.get_connection() as conn:
+        with self._conn() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "DELETE FROM saved_queries WHERE id = ? AND user_id = ?",
@@ -218,42 +465,79 @@ class SavedQueriesService:
             return cursor.rowcount > 0
     
     def increment_use_count(self, query_id: int) -> None:
-        """Increment the use count for a query"""
-        with self.get_connection() as conn:
+        """Increment the use count for a query (written asynchronously, see flush)"""
+        self._start_writer()
+        self._use_counts.put((query_id, datetime.utcnow().isoformat()))
+    
+    def flush(self) -> None:
+        """Block until all queued use-count increments have been written"""
+        if self._writer is None:
+            return
+        self._use_counts.join()
+    
+    def _start_writer(self) -> None:
+        """Start the background writer thread if it isn't running yet"""
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                writer = threading.Thread(
+                    target=self._writer_loop, name="saved-queries-writer", daemon=True
+                )
+                writer.start()
+                self._writer = writer
+    
+    def _writer_loop(self) -> None:
+        """Background thread: apply queued increments in batched transactions"""
+        while True:
+            batch = [self._use_counts.get()]
+            deadline = time.monotonic() + USE_COUNT_FLUSH_INTERVAL
+            while len(batch) < USE_COUNT_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._use_counts.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write_use_counts(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} use-count increment(s): {e}")
+            finally:
+                for _ in batch:
+                    self._use_counts.task_done()
+    
+    def _write_use_counts(self, batch: List[tuple]) -> None:
+        """Apply a batch of (query_id, timestamp) increments in one transaction"""
+        counts = Counter(query_id for query_id, _ in batch)
+        # Timestamps are queued in order, so the last one per id wins
+        latest = {query_id: updated_at for query_id, updated_at in batch}
+        
+        with self._conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany("""
                 UPDATE saved_queries 
-                SET use_count = use_count + 1, updated_at = ?
+                SET use_count = use_count + ?, updated_at = ?
                 WHERE id = ?
-            """, (datetime.utcnow().isoformat(), query_id))
+            """, [(count, latest[query_id], query_id) for query_id, count in counts.items()])
             conn.commit()
     
-    def toggle_favorite(self, query_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    def toggle_favorite(self, query_id: int, user_id: int) -> Optional[SavedQueryRecord]:
         """Toggle favorite status"""
         query = self.get_query(query_id)
-        if not query or query['user_id'] != user_id:
+        if not query or query.user_id != user_id:
             return None
         
-        new_status = not query['is_favorite']
+        new_status = not query.is_favorite
         return self.update_query(query_id, user_id, is_favorite=new_status)
     
-    def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
-        """Convert database row to dict"""
-        result = dict(row)
-        
-        # Parse tags JSON
-        if result.get('tags'):
-            try:
-                result['tags'] = json.loads(result['tags'])
-            except json.JSONDecodeError:
-                result['tags'] = []
-        else:
-            result['tags'] = []
-        
-        # Convert boolean
-        result['is_favorite'] = bool(result.get('is_favorite'))
-        
-        return result
+    @staticmethod
+    def _row_to_record(row: sqlite3.Row) -> SavedQueryRecord:
+        """Wrap a SELECT * / RETURNING * row without building an intermediate dict"""
+        return SavedQueryRecord(*row)
 
 
 # Global service instance
@@ -1,14 +1,136 @@
 import re
 import sqlparse
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import FrozenSet, Iterator, NamedTuple, Tuple, Optional
 import config
 
+# Patterns are compiled once at import and match case-insensitively against the
+# original query text, so no upper-cased copy of the query is needed
+_RE_INTO_KEYWORD = re.compile(r'\bINTO\b', re.IGNORECASE)
+_RE_FROM_TABLE = re.compile(r'\bFROM\s+(\[?\w+\]?\.?\[?\w+\]?)', re.IGNORECASE)
+_RE_INTO_TABLE = re.compile(r'\bINTO\s+(\[?\w+\]?\.?\[?\w+\]?)', re.IGNORECASE)
+_RE_UPDATE_TABLE = re.compile(r'\bUPDATE\s+(\[?\w+\]?\.?\[?\w+\]?)', re.IGNORECASE)
+# Leading DML keyword (prefix match, like str.startswith on the stripped text)
+_RE_LEADING_DML = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE)', re.IGNORECASE)
+# DDL keywords anywhere in the text (substring match)
+_RE_DDL_ANY = re.compile(r'DROP|CREATE|ALTER', re.IGNORECASE)
+# Single-pass scan for every keyword the dangerous-operation rules look at.
+# Each alternative sits inside a lookahead so overlapping hits are all reported.
+_RE_DANGER_SCAN = re.compile(
+    r'(?=(?P<drop>\bDROP\s+(?:TABLE|DATABASE|SCHEMA|INDEX|VIEW))'
+    r'|(?P<truncate>TRUNCATE)'
+    r'|(?P<delete>DELETE)'
+    r'|(?P<update>UPDATE)'
+    r'|(?P<alter>ALTER)'
+    r'|(?P<exec>\b(?:EXEC|EXECUTE|SP_|XP_)\b)'
+    r'|(?P<where>\bWHERE\b))',
+    re.IGNORECASE
+)
+# Literal substrings, one of which must occur for any _RE_DANGER_SCAN rule to
+# fire; a plain alternation search is far cheaper than running the scan
+_RE_DANGER_HINT = re.compile(r'DROP|TRUNCATE|DELETE|UPDATE|ALTER|EXEC|SP_|XP_', re.IGNORECASE)
+# T-SQL batch separator
+_RE_GO = re.compile(r'\bGO\b', re.IGNORECASE)
+_RE_GO_ANY = re.compile(r'GO', re.IGNORECASE)
+
+
+class AnalysisResult(NamedTuple):
+    """Parse-derived facts about a query, shared by the validator methods"""
+    statement_count: int        # number of sqlparse statements
+    is_select: bool             # first statement's leading keyword is SELECT
+    all_select: bool            # every statement's leading keyword is SELECT
+    keywords: FrozenSet[str]    # _RE_DANGER_SCAN groups found in the query
+
+
+def _leading_keyword_is_select(statement) -> Optional[bool]:
+    """Check whether a statement's first keyword is SELECT (None if it has none)"""
+    # Get first token that's not whitespace or comment
+    for token in statement.tokens:
+        if token.ttype is None and hasattr(token, 'tokens'):
+            # It's a group, get first keyword
+            for subtoken in token.tokens:
+                if subtoken.ttype in (sqlparse.tokens.Keyword.DML, sqlparse.tokens.Keyword):
+                    return subtoken.value.upper() == 'SELECT'
+        elif token.ttype in (sqlparse.tokens.Keyword.DML, sqlparse.tokens.Keyword):
+            return token.value.upper() == 'SELECT'
+    return None
+
+
+def _first_keyword_is_select(statements: tuple, query: str) -> bool:
+    """Check whether the first keyword of the first statement is SELECT"""
+    if not statements:
+        return False
+    
+    result = _leading_keyword_is_select(statements[0])
+    if result is not None:
+        return result
+    
+    leading = _RE_LEADING_DML.match(query)
+    return leading is not None and leading.group(1).upper() == 'SELECT'
+
+
+@lru_cache(maxsize=256)
+def _analyze(query: str) -> AnalysisResult:
+    """
+    Parse and scan a query once; re-runs of the same text hit the cache.
+    Only the derived facts are cached, the parse tree is dropped on return.
+    """
+    statements = tuple(sqlparse.parse(query))
+    
+    # Most playground queries are plain SELECTs: skip the scan unless a hint is present
+    if _RE_DANGER_HINT.search(query):
+        keywords = frozenset(
+            match.lastgroup for match in _RE_DANGER_SCAN.finditer(query)
+        )
+    else:
+        keywords = frozenset()
+    
+    # A batch can hold several ';'-separated statements: all of them must be
+    # SELECTs (comment-only trailers count as harmless)
+    is_select = _first_keyword_is_select(statements, query)
+    all_select = is_select and all(
+        statement.token_first(skip_ws=True, skip_cm=True) is None
+        or _leading_keyword_is_select(statement) is True
+        for statement in statements[1:]
+    )
+    return AnalysisResult(
+        statement_count=len(statements),
+        is_select=is_select,
+        all_select=all_select,
+        keywords=keywords
+    )
+
+
+@lru_cache(maxsize=256)
+def _affected_objects(query: str) -> Tuple[Optional[str], Tuple[str, ...]]:
+    """Return (operation, tables) for a query, cached per query text"""
+    operation = None
+    
+    # Determine operation type
+    leading = _RE_LEADING_DML.match(query)
+    if leading:
+        operation = leading.group(1).upper()
+    else:
+        ddl = {word.upper() for word in _RE_DDL_ANY.findall(query)}
+        for keyword in ("DROP", "CREATE", "ALTER"):
+            if keyword in ddl:
+                operation = keyword
+                break
+    
+    # Extract table names (basic regex, not perfect but functional):
+    # FROM, INTO and UPDATE clauses, upper-cased with duplicates removed
+    tables = set()
+    for pattern in (_RE_FROM_TABLE, _RE_INTO_TABLE, _RE_UPDATE_TABLE):
+        tables.update(name.upper() for name in pattern.findall(query))
+    
+    return operation, tuple(tables)
+
 
 class QueryValidator:
     """Validates SQL queries for security and safety"""
     
     def __init__(self):
-        self.dangerous_keywords = config.DANGEROUS_KEYWORDS
+        self.dangerous_keywords = config.DANGEROUS_KEYWORDS_SET
     
     def validate(self, query: str) -> Tuple[bool, Optional[str], bool]:
         """
@@ -23,9 +145,8 @@ class QueryValidator:
         if not query or not query.strip():
             return False, "Query cannot be empty", False
         
-        # Parse query
-        parsed = sqlparse.parse(query)
-        if not parsed:
+        # Parse query (cached per query text)
+        if not _analyze(query).statement_count:
             return False, "Invalid SQL syntax", False
         
         # Check for dangerous operations
@@ -40,36 +161,35 @@ class QueryValidator:
         Returns:
             Tuple of (requires_confirmation, warning_message)
         """
-        query_upper = query.upper()
+        # Keywords occurring anywhere in the query, from the cached single-pass scan
+        found = _analyze(query).keywords
+        if not found:
+            return False, None
         
         # Check for DROP statements
-        if "DROP" in query_upper:
-            if re.search(r'\bDROP\s+(TABLE|DATABASE|SCHEMA|INDEX|VIEW)', query_upper):
-                return True, "This query will permanently delete database objects"
+        if "drop" in found:
+            return True, "This query will permanently delete database objects"
         
         # Check for TRUNCATE
-        if "TRUNCATE" in query_upper:
+        if "truncate" in found:
             return True, "This query will delete all rows from the table"
         
         # Check for DELETE without WHERE
         if config.REQUIRE_WHERE_FOR_DELETE:
-            if "DELETE" in query_upper:
-                # Simple check for WHERE clause
-                if not re.search(r'\bWHERE\b', query_upper):
-                    return True, "DELETE without WHERE clause will delete all rows"
+            if "delete" in found and "where" not in found:
+                return True, "DELETE without WHERE clause will delete all rows"
         
         # Check for UPDATE without WHERE
         if config.REQUIRE_WHERE_FOR_DELETE:
-            if "UPDATE" in query_upper:
-                if not re.search(r'\bWHERE\b', query_upper):
-                    return True, "UPDATE without WHERE clause will modify all rows"
+            if "update" in found and "where" not in found:
+                return True, "UPDATE without WHERE clause will modify all rows"
         
         # Check for ALTER statements
-        if "ALTER" in query_upper:
+        if "alter" in found:
             return True, "This query will modify database structure"
         
         # Check for stored procedure execution
-        if re.search(r'\b(EXEC|EXECUTE|SP_|XP_)\b', query_upper):
+        if "exec" in found:
             return True, "Executing stored procedures requires confirmation"
         
         return False, None
@@ -84,39 +204,46 @@ class QueryValidator:
         Returns:
             List of individual SQL statements
         """
-        # Handle GO separator (T-SQL batch separator)
-        if "GO" in query.upper():
-            statements = re.split(r'\bGO\b', query, flags=re.IGNORECASE)
-            statements = [s.strip() for s in statements if s.strip()]
-        else:
-            # Use sqlparse to split statements
-            statements = sqlparse.split(query)
-            statements = [s.strip() for s in statements if s.strip()]
-        
-        return statements
+        return list(self.iter_statements(query))
+    
+    def iter_statements(self, query: str) -> Iterator[str]:
+        """
+        Lazily yield individual SQL statements (see split_statements)
+        
+        Args:
+            query: SQL query potentially containing multiple statements
+            
+        Yields:
+            Non-empty, stripped SQL statements
+        """
+        # Handle GO separator (T-SQL batch separator) by slicing between matches
+        if _RE_GO_ANY.search(query):
+            start = 0
+            for match in _RE_GO.finditer(query):
+                statement = query[start:match.start()].strip()
+                if statement:
+                    yield statement
+                start = match.end()
+            statement = query[start:].strip()
+            if statement:
+                yield statement
+            return
+        
+        # Split with sqlparse's ungrouped filter stack, yielding statements lazily
+        for parsed in sqlparse.engine.FilterStack().run(query):
+            statement = str(parsed).strip()
+            if statement:
+                yield statement
     
     def is_select_only(self, query: str) -> bool:
         """Check if query is SELECT only (read-only)"""
-        query_upper = query.upper().strip()
-        
-        # Parse to get statement type
-        parsed = sqlparse.parse(query)
-        if not parsed:
+        return _analyze(query).is_select
+    
+    def is_read_only(self, query: str) -> bool:
+        """Check if query only reads data (every statement a SELECT, no INTO)"""
+        if not _analyze(query).all_select:
             return False
-        
-        statement = parsed[0]
-        
-        # Get first token that's not whitespace or comment
-        for token in statement.tokens:
-            if token.ttype is None and hasattr(token, 'tokens'):
-                # It's a group, get first keyword
-                for subtoken in token.tokens:
-                    if subtoken.ttype in (sqlparse.tokens.Keyword.DML, sqlparse.tokens.Keyword):
-                        return subtoken.value.upper() == 'SELECT'
-            elif token.ttype in (sqlparse.tokens.Keyword.DML, sqlparse.tokens.Keyword):
-                return token.value.upper() == 'SELECT'
-        
-        return query_upper.startswith('SELECT')
+        return not _RE_INTO_KEYWORD.search(query)
     
     def extract_affected_objects(self, query: str) -> dict:
         """
@@ -125,46 +252,12 @@ class QueryValidator:
         Returns:
             Dictionary with affected tables and operation type
         """
-        query_upper = query.upper()
-        result = {
-            "operation": None,
-            "tables": [],
+        operation, tables = _affected_objects(query)
+        return {
+            "operation": operation,
+            "tables": list(tables),
             "databases": []
         }
-        
-        # Determine operation type
-        if query_upper.strip().startswith('SELECT'):
-            result["operation"] = "SELECT"
-        elif query_upper.strip().startswith('INSERT'):
-            result["operation"] = "INSERT"
-        elif query_upper.strip().startswith('UPDATE'):
-            result["operation"] = "UPDATE"
-        elif query_upper.strip().startswith('DELETE'):
-            result["operation"] = "DELETE"
-        elif 'DROP' in query_upper:
-            result["operation"] = "DROP"
-        elif 'CREATE' in query_upper:
-            result["operation"] = "CREATE"
-        elif 'ALTER' in query_upper:
-            result["operation"] = "ALTER"
-        
-        # Extract table names (basic regex, not perfect but functional)
-        # FROM clause
-        from_match = re.findall(r'\bFROM\s+(\[?\w+\]?\.?\[?\w+\]?)', query_upper)
-        result["tables"].extend(from_match)
-        
-        # INTO clause
-        into_match = re.findall(r'\bINTO\s+(\[?\w+\]?\.?\[?\w+\]?)', query_upper)
-        result["tables"].extend(into_match)
-        
-        # UPDATE clause
-        update_match = re.findall(r'\bUPDATE\s+(\[?\w+\]?\.?\[?\w+\]?)', query_upper)
-        result["tables"].extend(update_match)
-        
-        # Remove duplicates
-        result["tables"] = list(set(result["tables"]))
-        
-        return result
 
 
 # Global validator instance
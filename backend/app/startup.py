@@ -17,47 +17,44 @@ def validate_sql_server_connection():
     """
     try:
         logger.info("Validating SQL Server connection...")
-        conn = provisioner._get_admin_connection()
-        cursor = conn.cursor()
-        
-        # Get server info
-        cursor.execute("SELECT @@VERSION, DB_NAME(), SUSER_NAME()")
-        row = cursor.fetchone()
-        version = row[0][:80]
-        database = row[1]
-        login = row[2]
-        
-        logger.info(f"  Connected as: {login}")
-        logger.info(f"  Database: {database}")
-        logger.info(f"  Version: {version}")
-        
-        cursor.execute("""
-            SELECT 
-                CASE 
-                    WHEN IS_SRVROLEMEMBER('sysadmin') = 1 THEN 1 
-                    ELSE HAS_PERMS_BY_NAME(NULL, 'DATABASE', 'CREATE DATABASE') 
-                END AS can_create_db,
-                CASE 
-                    WHEN IS_SRVROLEMEMBER('sysadmin') = 1 THEN 1 
-                    ELSE HAS_PERMS_BY_NAME(NULL, 'SERVER', 'ALTER ANY LOGIN') 
-                END AS can_create_login
-        """)
-        perms = cursor.fetchone()
-        can_create_db = perms[0]
-        can_create_login = perms[1]
-        
-        conn.close()
-        
-        # Validate permissions
-        if not can_create_db:
-            logger.error("  ✗ Missing CREATE DATABASE permission")
-            logger.error("  Grant with: ALTER SERVER ROLE sysadmin ADD MEMBER [your_login]")
-            return False
+        with provisioner._get_admin_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Server info plus one combined permission bit in a single round-trip
+            cursor.execute("""
+                SELECT 
+                    @@VERSION,
+                    DB_NAME(),
+                    SUSER_NAME(),
+                    CAST(CASE 
+                        WHEN IS_SRVROLEMEMBER('sysadmin') = 1 THEN 1 
+                        WHEN HAS_PERMS_BY_NAME(NULL, 'DATABASE', 'CREATE DATABASE') = 1 
+                             AND HAS_PERMS_BY_NAME(NULL, 'SERVER', 'ALTER ANY LOGIN') = 1 THEN 1 
+                        ELSE 0 
+                    END AS bit) AS has_required_perms
+            """)
+            version, database, login, has_required_perms = cursor.fetchone()[:4]
+            version = version[:80]
+            
+            logger.info(f"  Connected as: {login}")
+            logger.info(f"  Database: {database}")
+            logger.info(f"  Version: {version}")
             
-        if not can_create_login:
-            logger.error("  ✗ Missing ALTER ANY LOGIN permission")
-            logger.error("  Grant with: ALTER SERVER ROLE sysadmin ADD MEMBER [your_login]")
-            return False
+            if not has_required_perms:
+                # Diagnostic query only on failure, to report which permission is missing
+                cursor.execute("""
+                    SELECT 
+                        HAS_PERMS_BY_NAME(NULL, 'DATABASE', 'CREATE DATABASE') AS can_create_db,
+                        HAS_PERMS_BY_NAME(NULL, 'SERVER', 'ALTER ANY LOGIN') AS can_create_login
+                """)
+                can_create_db, can_create_login = cursor.fetchone()[:2]
+                
+                if not can_create_db:
+                    logger.error("  ✗ Missing CREATE DATABASE permission")
+                if not can_create_login:
+                    logger.error("  ✗ Missing ALTER ANY LOGIN permission")
+                logger.error("  Grant with: ALTER SERVER ROLE sysadmin ADD MEMBER [your_login]")
+                return False
         
         logger.info("  ✓ Has CREATE DATABASE permission")
         logger.info("  ✓ Has ALTER ANY LOGIN permission")
@@ -1,41 +1,106 @@
-import uuid
+import secrets
 import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, Tuple
 import config
 
+# Rough per-entry cost (record, id, timestamp, numbers) on top of the query/error text
+_HISTORY_ENTRY_OVERHEAD = 512
+
+
+@dataclass
+class Session:
+    """Per-session bookkeeping record"""
+    __slots__ = ('created_at', 'last_activity', 'query_count')
+    
+    created_at: str        # ISO wall-clock time, display only
+    last_activity: float   # time.monotonic() seconds
+    query_count: int
+
+
+@dataclass
+class HistoryEntry:
+    """One executed query in a session's history"""
+    __slots__ = ('id', 'query', 'timestamp', 'execution_time', 'row_count', 'success', 'error')
+    
+    id: str
+    query: str
+    timestamp: str
+    execution_time: float
+    row_count: int
+    success: bool
+    error: Optional[str]
+    
+    def to_dict(self) -> dict:
+        """API representation"""
+        return {
+            "id": self.id,
+            "query": self.query,
+            "timestamp": self.timestamp,
+            "execution_time": self.execution_time,
+            "row_count": self.row_count,
+            "success": self.success,
+            "error": self.error
+        }
+
 
 class SessionManager:
     """Manages user sessions and tracking"""
     
     def __init__(self):
-        self.sessions: Dict[str, dict] = {}
-        self.query_history: Dict[str, list] = {}
-    
-    def create_session(self) -> str:
-        """Create a new session and return session ID"""
-        session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {
-            "created_at": datetime.now(),
-            "last_activity": datetime.now(),
-            "query_count": 0
-        }
-        self.query_history[session_id] = []
+        # Ordered by last activity (oldest first): update_activity moves a
+        # session to the end, so expiry and eviction only look at the head
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Per-session history; MAX_HISTORY_ITEMS is a hard cap (oldest drop off)
+        self.query_history: Dict[str, deque] = {}
+        # Every stored history entry in insertion order (entry id -> (session id,
+        # approximate bytes)), so MAX_HISTORY_BYTES is enforced across sessions
+        self._history_order: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._history_bytes = 0
+        # Guards both maps. Current callers (handlers and the session sweeper task)
+        # all run on the event loop; the lock keeps the maps consistent for any
+        # caller that reaches them from a worker thread (sync handlers, to_thread)
+        self._lock = threading.RLock()
+    
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """
+        Create a new session and return session ID
+        
+        Args:
+            session_id: Register this client-provided ID instead of generating one
+        """
+        if session_id is None:
+            session_id = secrets.token_hex(16)
+        
+        with self._lock:
+            self.sessions[session_id] = Session(
+                created_at=datetime.now().isoformat(),
+                last_activity=time.monotonic(),
+                query_count=0
+            )
+            self.sessions.move_to_end(session_id)
+            self.query_history[session_id] = deque(maxlen=config.MAX_HISTORY_ITEMS)
+            
+            # Enforce the session cap by evicting the least recently active
+            while len(self.sessions) > config.MAX_SESSIONS:
+                oldest_id = next(iter(self.sessions))
+                self.cleanup_session(oldest_id)
+        
         return session_id
     
     def validate_session(self, session_id: str) -> bool:
         """Check if session is valid and not expired"""
-        if session_id not in self.sessions:
-            return False
-        
-        session = self.sessions[session_id]
-        last_activity = session.get("last_activity")
-        
-        if not last_activity:
+        session = self.sessions.get(session_id)
+        if session is None:
             return False
         
-        # Check if session expired
-        if datetime.now() - last_activity > timedelta(seconds=config.SESSION_TIMEOUT):
+        # Check if session expired (monotonic seconds)
+        if time.monotonic() - session.last_activity > config.SESSION_TIMEOUT:
             self.cleanup_session(session_id)
             return False
         
@@ -43,64 +108,134 @@ class SessionManager:
     
     def update_activity(self, session_id: str):
         """Update last activity timestamp for session"""
-        if session_id in self.sessions:
-            self.sessions[session_id]["last_activity"] = datetime.now()
-            self.sessions[session_id]["query_count"] += 1
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_activity = time.monotonic()
+                session.query_count += 1
+                self.sessions.move_to_end(session_id)
     
     def add_to_history(self, session_id: str, query: str, result: dict):
         """Add query to session history"""
-        if session_id not in self.query_history:
-            self.query_history[session_id] = []
-        
-        history_entry = {
-            "id": str(uuid.uuid4()),
-            "query": query,
-            "timestamp": datetime.now().isoformat(),
-            "execution_time": result.get("execution_time", 0),
-            "row_count": result.get("row_count", 0),
-            "success": result.get("success", False),
-            "error": result.get("error")
-        }
+        # Stored as a slotted record; converted to a dict only when read
+        history_entry = HistoryEntry(
+            id=secrets.token_hex(16),
+            query=query,
+            timestamp=datetime.now().isoformat(),
+            execution_time=result.get("execution_time", 0),
+            row_count=result.get("row_count", 0),
+            success=result.get("success", False),
+            error=result.get("error")
+        )
         
-        self.query_history[session_id].append(history_entry)
+        size = _HISTORY_ENTRY_OVERHEAD + len(query) + len(history_entry.error or "")
         
-        # Keep only recent history
-        if len(self.query_history[session_id]) > config.MAX_HISTORY_ITEMS:
-            self.query_history[session_id] = self.query_history[session_id][-config.MAX_HISTORY_ITEMS:]
+        with self._lock:
+            history = self.query_history.get(session_id)
+            if history is None:
+                history = self.query_history[session_id] = deque(maxlen=config.MAX_HISTORY_ITEMS)
+            
+            # Per-session cap: drop this session's oldest entry
+            if len(history) == history.maxlen:
+                self._forget_history_entry(history.popleft().id)
+            
+            history.append(history_entry)
+            self._history_order[history_entry.id] = (session_id, size)
+            self._history_bytes += size
+            
+            # Global budget: drop the oldest entries server-wide. A session's
+            # entries are appended in time order, so its globally oldest entry
+            # is always at the left of its deque.
+            while self._history_bytes > config.MAX_HISTORY_BYTES and self._history_order:
+                entry_id, (owner_id, _) = next(iter(self._history_order.items()))
+                owner_history = self.query_history.get(owner_id)
+                if owner_history and owner_history[0].id == entry_id:
+                    owner_history.popleft()
+                self._forget_history_entry(entry_id)
+    
+    def _forget_history_entry(self, entry_id: str):
+        """Drop an entry from the global history accounting"""
+        _, size = self._history_order.pop(entry_id, (None, 0))
+        self._history_bytes -= size
     
     def get_history(self, session_id: str, limit: Optional[int] = None) -> list:
         """Get query history for session"""
-        if session_id not in self.query_history:
-            return []
-        
-        history = self.query_history[session_id]
-        
-        if limit:
-            return history[-limit:]
-        
-        return history
+        with self._lock:
+            history = self.query_history.get(session_id)
+            if history is None:
+                return []
+            
+            if limit:
+                entries = islice(history, max(0, len(history) - limit), None)
+            else:
+                entries = history
+            
+            return [entry.to_dict() for entry in entries]
+    
+    def clear_history(self, session_id: str):
+        """Clear query history for session"""
+        with self._lock:
+            history = self.query_history.get(session_id)
+            if history is not None:
+                for entry in history:
+                    self._forget_history_entry(entry.id)
+                history.clear()
     
     def cleanup_session(self, session_id: str):
         """Remove expired session data"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-        if session_id in self.query_history:
-            del self.query_history[session_id]
+        with self._lock:
+            self.sessions.pop(session_id, None)
+            self.clear_history(session_id)
+            self.query_history.pop(session_id, None)
     
     def cleanup_expired_sessions(self):
         """Clean up all expired sessions"""
-        expired = []
-        for session_id, session in self.sessions.items():
-            last_activity = session.get("last_activity")
-            if last_activity and datetime.now() - last_activity > timedelta(seconds=config.SESSION_TIMEOUT):
-                expired.append(session_id)
+        timeout = config.SESSION_TIMEOUT
+        now = time.monotonic()
         
-        for session_id in expired:
-            self.cleanup_session(session_id)
+        # Sessions are ordered by last activity, so stop at the first fresh one
+        with self._lock:
+            while self.sessions:
+                session_id, session = next(iter(self.sessions.items()))
+                if now - session.last_activity <= timeout:
+                    break
+                self.cleanup_session(session_id)
     
     def get_session_info(self, session_id: str) -> Optional[dict]:
         """Get session information"""
-        return self.sessions.get(session_id)
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        return self._session_info(session, time.monotonic(), datetime.now())
+    
+    def get_bulk_session_info(self, session_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Get information for several sessions in one call
+        
+        Args:
+            session_ids: Session IDs to look up (unknown IDs are skipped)
+            
+        Returns:
+            Dictionary mapping session ID to session information
+        """
+        mono_now = time.monotonic()
+        wall_now = datetime.now()
+        with self._lock:
+            return {
+                session_id: self._session_info(self.sessions[session_id], mono_now, wall_now)
+                for session_id in session_ids
+                if session_id in self.sessions
+            }
+    
+    @staticmethod
+    def _session_info(session: Session, mono_now: float, wall_now: datetime) -> dict:
+        """Session record as a dict for display, with last_activity as wall-clock ISO time"""
+        idle = mono_now - session.last_activity
+        return {
+            "created_at": session.created_at,
+            "last_activity": (wall_now - timedelta(seconds=idle)).isoformat(),
+            "query_count": session.query_count
+        }
 
 
 # Global session manager
@@ -109,9 +244,14 @@ session_manager = SessionManager()
 
 def generate_request_id() -> str:
     """Generate unique request ID for tracking"""
-    return str(uuid.uuid4())
+    return secrets.token_hex(16)
 
 
-def hash_query(query: str) -> str:
-    """Generate hash of query for caching/comparison"""
-    return hashlib.sha256(query.encode()).hexdigest()
\ No newline at end of file
+def hash_query(query: str) -> bytes:
+    """
+    Generate hash of query for caching/comparison
+    
+    Not for integrity checks: a 16-byte BLAKE2b digest is cheaper than SHA-256
+    and makes a compact dict key (call .hex() where a string is required).
+    """
+    return hashlib.blake2b(query.encode('utf-8'), digest_size=16).digest()
\ No newline at end of file
@@ -1,13 +1,23 @@
+import logging
 import os
+import secrets
+import sys
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables from .env if present
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 # Base directory for the backend (this file's parent)
 BASE_DIR = Path(__file__).resolve().parent
 
+# Load environment variables from backend/.env if present; checking the one
+# documented location avoids load_dotenv()'s upward directory search on every
+# (re)start, and production environments without the file skip it entirely
+ENV_FILE = BASE_DIR / ".env"
+if ENV_FILE.is_file():
+    load_dotenv(ENV_FILE)
+
 # Database Configuration
 DB_SERVER = os.getenv("DB_SERVER", "DESKTOP-M6L3RIM")
 DB_DATABASE = os.getenv("DB_DATABASE", "master")
@@ -16,33 +26,53 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_TRUSTED_CONNECTION = os.getenv("DB_TRUSTED_CONNECTION", "yes").lower() == "yes"
 DB_DRIVER = os.getenv("DB_DRIVER", "ODBC Driver 17 for SQL Server")
 
-# Build connection string
+
+
+def _format_escape(value: str) -> str:
+    """Escape braces so a value survives str.format() in the template"""
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+# Build connection string template with a {database} slot; use
+# connection strings built from it (interned) so identical targets share
+# one pyodbc pool key
 if DB_TRUSTED_CONNECTION:
-    CONNECTION_STRING = (
-        f"DRIVER={{{DB_DRIVER}}};"
-        f"SERVER={DB_SERVER};"
-        f"DATABASE={DB_DATABASE};"
-        f"Trusted_Connection=yes;"
+    CONNECTION_STRING_TEMPLATE = (
+        f"DRIVER={{{{{_format_escape(DB_DRIVER)}}}}};"
+        f"SERVER={_format_escape(DB_SERVER)};"
+        "DATABASE={database};"
+        "Trusted_Connection=yes;"
     )
 else:
-    CONNECTION_STRING = (
-        f"DRIVER={{{DB_DRIVER}}};"
-        f"SERVER={DB_SERVER};"
-        f"DATABASE={DB_DATABASE};"
-        f"UID={DB_USERNAME};"
-        f"PWD={DB_PASSWORD};"
+    CONNECTION_STRING_TEMPLATE = (
+        f"DRIVER={{{{{_format_escape(DB_DRIVER)}}}}};"
+        f"SERVER={_format_escape(DB_SERVER)};"
+        "DATABASE={database};"
+        f"UID={_format_escape(DB_USERNAME)};"
+        f"PWD={_format_escape(DB_PASSWORD)};"
     )
 
+CONNECTION_STRING = sys.intern(CONNECTION_STRING_TEMPLATE.format(database=DB_DATABASE))
+
 # Query Execution Settings
 MAX_EXECUTION_TIME = int(os.getenv("MAX_EXECUTION_TIME", "30"))  # seconds
 MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", "10000"))
 MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "3"))
+MAX_WORKER_THREADS = int(os.getenv("MAX_WORKER_THREADS", "10"))  # shared default executor size
+ADMIN_POOL_SIZE = int(os.getenv("ADMIN_POOL_SIZE", "5"))  # pooled admin connections for provisioning
+
+# Query Cache Settings
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()  # "memory" or "redis"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")  # use a db reserved for the cache
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.5"))  # connect/read timeout in seconds
 
 # Security Settings
 DANGEROUS_KEYWORDS = [
     "DROP", "TRUNCATE", "DELETE", "ALTER",
     "EXEC", "EXECUTE", "SP_", "XP_"
 ]
+# Frozenset for token-based membership checks
+DANGEROUS_KEYWORDS_SET = frozenset(DANGEROUS_KEYWORDS)
 
 # Enable confirmation for queries without WHERE clause
 REQUIRE_WHERE_FOR_DELETE = os.getenv("REQUIRE_WHERE_FOR_DELETE", "true").lower() == "true"
@@ -51,32 +81,53 @@ REQUIRE_WHERE_FOR_DELETE = os.getenv("REQUIRE_WHERE_FOR_DELETE", "true").lower()
 ENABLE_AUDIT_LOG = os.getenv("ENABLE_AUDIT_LOG", "true").lower() == "true"
 AUDIT_LOG_FILE = BASE_DIR / "logs" / "audit.log"
 AUDIT_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+AUDIT_LOG_MAX_BYTES = int(os.getenv("AUDIT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # rotate at 10 MB
+AUDIT_LOG_BACKUP_COUNT = int(os.getenv("AUDIT_LOG_BACKUP_COUNT", "5"))
 
 # CORS Settings
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
+CORS_ORIGINS = tuple(
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
+    if origin.strip()
+)
 
 # Server Settings
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
-RELOAD = os.getenv("RELOAD", "true").lower() == "true"
+RELOAD = os.getenv("RELOAD", "false").lower() == "true"
+# Uvicorn worker processes (ignored when RELOAD is on). Sessions, query history,
+# rate limits and the memory query cache live in process memory, so more than
+# one worker needs an external session store; keep 1 unless that is in place.
+WORKERS = int(os.getenv("WORKERS", "1"))
 
 # Session Settings
 SESSION_TIMEOUT = int(os.getenv("SESSION_TIMEOUT", "3600"))  # 1 hour
 MAX_HISTORY_ITEMS = int(os.getenv("MAX_HISTORY_ITEMS", "100"))
+MAX_HISTORY_BYTES = int(os.getenv("MAX_HISTORY_BYTES", str(50 * 1024 * 1024)))  # across all sessions
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))  # least recently active evicted first
 
 # Authentication Settings
 JWT_SECRET = os.getenv("JWT_SECRET")
-if not JWT_SECRET:
+_JWT_SECRET_DEFAULTED = not JWT_SECRET
+if _JWT_SECRET_DEFAULTED:
     # Generate a random secret if not provided (for development only)
-    import secrets
     JWT_SECRET = secrets.token_urlsafe(32)
-    logger = __import__('logging').getLogger(__name__)
-    logger.warning("⚠️  JWT_SECRET not set! Using random secret. Generate one with: python -c \"import secrets; print(secrets.token_urlsafe(32))\"")
 
 ADMIN_SETUP_KEY = os.getenv("ADMIN_SETUP_KEY")
-if not ADMIN_SETUP_KEY:
+_ADMIN_SETUP_KEY_DEFAULTED = not ADMIN_SETUP_KEY
+if _ADMIN_SETUP_KEY_DEFAULTED:
     ADMIN_SETUP_KEY = "CHANGE_THIS_SETUP_KEY"
-    logger = __import__('logging').getLogger(__name__)
-    logger.warning("⚠️  ADMIN_SETUP_KEY not set! Using default. Please set a secure value in .env")
+
+
+@lru_cache(maxsize=None)
+def _warn_defaults():
+    """Warn about insecure defaulted secrets (at most once per process)"""
+    if _JWT_SECRET_DEFAULTED:
+        logger.warning("⚠️  JWT_SECRET not set! Using random secret. Generate one with: python -c \"import secrets; print(secrets.token_urlsafe(32))\"")
+    if _ADMIN_SETUP_KEY_DEFAULTED:
+        logger.warning("⚠️  ADMIN_SETUP_KEY not set! Using default. Please set a secure value in .env")
+
+
+_warn_defaults()
 
 SESSION_DURATION_HOURS = int(os.getenv("SESSION_DURATION_HOURS", "8"))
@@ -2,9 +2,21 @@
 SQL Playground Backend Server
 Run this file to start the API server
 """
+import importlib.util
+import sys
 import uvicorn
 import config
 
+
+def _server_impl():
+    """Pick uvloop/httptools where available, uvicorn's defaults elsewhere"""
+    if sys.platform == "win32":
+        return "auto", "auto"
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "auto"
+    http = "httptools" if importlib.util.find_spec("httptools") else "auto"
+    return loop, http
+
+
 if __name__ == "__main__":
     print("\n" + "=" * 60)
     print("SQL Playground - Starting Backend Server")
@@ -15,11 +27,15 @@ if __name__ == "__main__":
     print(f"WebSocket: ws://localhost:{config.PORT}/ws")
     print("=" * 60 + "\n")
 
+    loop, http = _server_impl()
     uvicorn.run(
         "app.main:app",
         host=config.HOST,
         port=config.PORT,
         reload=config.RELOAD,
+        workers=None if config.RELOAD else config.WORKERS,
+        loop=loop,
+        http=http,
         log_level="info"
     )
 
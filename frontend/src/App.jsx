@@ -15,7 +15,7 @@ import KeyboardShortcuts from './components/KeyboardShortcuts';
 import { ToastProvider, showToast } from './components/Toast';
 import { AuthProvider, useAuth } from './contexts/AuthContext';
 import { apiService } from './services/api';
-import { exportToCSV, exportToJSON } from './utils/helpers';
+import { exportToCSV, exportToJSON, rowsToRecords } from './utils/helpers';
 import { useKeyboardShortcuts } from './hooks/useKeyboardShortcuts';
 import { 
   Database, 
@@ -165,7 +165,7 @@ const SQLPlayground = memo(() => {
   };
 
   const handleExport = (format) => {
-    if (!result?.data || result.data.length === 0) {
+    if (!result?.rows || result.rows.length === 0) {
       showToast.warning('No data to export');
       return;
     }
@@ -174,11 +174,11 @@ const SQLPlayground = memo(() => {
 
     try {
       if (format === 'csv') {
-        exportToCSV(result.data, result.columns, filename);
-        showToast.success(`Exported ${result.data.length} rows to CSV`);
+        exportToCSV(result.rows, result.columns, filename);
+        showToast.success(`Exported ${result.rows.length} rows to CSV`);
       } else if (format === 'json') {
-        exportToJSON(result.data, filename);
-        showToast.success(`Exported ${result.data.length} rows to JSON`);
+        exportToJSON(rowsToRecords(result.columns, result.rows), filename);
+        showToast.success(`Exported ${result.rows.length} rows to JSON`);
       }
     } catch (err) {
       console.error('Export failed:', err);
@@ -16,14 +16,15 @@ import 'ag-grid-community/styles/ag-grid.css';
 import 'ag-grid-community/styles/ag-theme-alpine.css';
 import config from '../config';
 import { showToast } from './Toast';
+import { rowsToRecords } from '../utils/helpers';
 
 const ResultsGrid = ({ result, onExport }) => {
-  // Generate column definitions from data
+  // Generate column definitions from data (rows are arrays, so fields are indexes)
   const columnDefs = useMemo(() => {
     if (!result || !result.columns) return [];
     
-    return result.columns.map(col => ({
-      field: col,
+    return result.columns.map((col, index) => ({
+      field: String(index),
       headerName: col,
       sortable: true,
       filter: true,
@@ -48,8 +49,8 @@ const ResultsGrid = ({ result, onExport }) => {
   };
 
   const handleCopyResults = () => {
-    if (result?.data && result.data.length > 0) {
-      const text = JSON.stringify(result.data, null, 2);
+    if (result?.rows && result.rows.length > 0) {
+      const text = JSON.stringify(rowsToRecords(result.columns, result.rows), null, 2);
       navigator.clipboard.writeText(text);
       showToast.copied('Results copied to clipboard');
     }
@@ -158,7 +159,7 @@ const ResultsGrid = ({ result, onExport }) => {
         </div>
 
         {/* Export Buttons */}
-        {result.success && result.data && result.data.length > 0 && (
+        {result.success && result.rows && result.rows.length > 0 && (
           <motion.div 
             className="flex items-center gap-1.5 sm:gap-2 shrink-0 ml-4"
             initial={{ opacity: 0, x: 10 }}
@@ -208,7 +209,7 @@ const ResultsGrid = ({ result, onExport }) => {
         <div className="absolute top-0 left-0 right-0 h-px bg-gradient-to-r from-transparent via-primary-500/30 to-transparent" />
         
         {result.success ? (
-          result.data && result.data.length > 0 ? (
+          result.rows && result.rows.length > 0 ? (
             // Data Grid
             <motion.div 
               className="ag-theme-alpine-dark h-full"
@@ -217,7 +218,7 @@ const ResultsGrid = ({ result, onExport }) => {
               transition={{ duration: 0.3 }}
             >
               <AgGridReact
-                rowData={result.data}
+                rowData={result.rows}
                 columnDefs={columnDefs}
                 defaultColDef={defaultColDef}
                 pagination={true}
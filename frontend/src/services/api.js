@@ -85,7 +85,9 @@ export const apiService = {
       query,
       database,
       confirm_destructive: confirmDestructive,
+      format: 'tabular',
     });
+    // Tabular results keep `columns` + row arrays; the grid and CSV export read them as-is
     return response.data;
   },
 
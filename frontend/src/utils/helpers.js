@@ -1,12 +1,21 @@
-// Export data to CSV
+// Convert tabular results (column list + row arrays) into row objects
+export const rowsToRecords = (columns, rows) =>
+  rows.map(row => {
+    const record = {};
+    columns.forEach((col, i) => {
+      record[col] = row[i];
+    });
+    return record;
+  });
+
+// Export tabular data (row arrays in column order) to CSV
 export const exportToCSV = (data, columns, filename = 'export.csv') => {
     if (!data || data.length === 0) return;
   
     // Create CSV content
     const headers = columns.join(',');
     const rows = data.map(row => 
-      columns.map(col => {
-        const value = row[col];
+      row.map(value => {
         // Escape commas and quotes
         if (typeof value === 'string' && (value.includes(',') || value.includes('"'))) {
           return `"${value.replace(/"/g, '""')}"`;